@@ -0,0 +1,40 @@
+"""scheduled_posts pending index
+
+Revision ID: 3f9c1a7d2b4e
+Revises: 6be5eeb27aed
+Create Date: 2026-10-16 10:12:04.518320
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c1a7d2b4e'
+down_revision: Union[str, None] = '6be5eeb27aed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_sp_pending',
+            'scheduled_posts',
+            ['scheduled_time'],
+            unique=False,
+            postgresql_where=sa.text("status = 'pending'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_sp_pending',
+            table_name='scheduled_posts',
+            postgresql_concurrently=True,
+        )
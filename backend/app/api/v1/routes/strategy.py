@@ -1,9 +1,7 @@
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
 from app.dependencies import get_current_user
 from app.models.user import User
 from app.schemas.strategy import (
@@ -25,7 +23,6 @@ router = APIRouter(prefix="/strategy", tags=["strategy-copilot"])
 async def generate_strategy(
     data: StrategyQuestionnaire,
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ) -> StrategyResponse:
     """Generate a comprehensive content strategy from a questionnaire.
 
@@ -37,7 +34,6 @@ async def generate_strategy(
         result = await strategy_copilot_service.generate_content_strategy(
             answers=data.model_dump(),
             user_id=user.id,
-            db=db,
         )
         return result
     except ValueError as exc:
@@ -57,7 +53,6 @@ async def generate_strategy(
 async def generate_post_ideas(
     data: PostIdeasRequest,
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ) -> PostIdeasResponse:
     """Generate specific post ideas based on an existing strategy context.
 
@@ -70,7 +65,6 @@ async def generate_post_ideas(
             count=data.count,
             platform=data.platform,
             user_id=user.id,
-            db=db,
         )
         return PostIdeasResponse(ideas=ideas)
     except ValueError as exc:
@@ -90,7 +84,6 @@ async def generate_post_ideas(
 async def analyze_performance(
     data: PerformanceAnalysisRequest,
     user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ) -> PerformanceAnalysisResponse:
     """Analyze past content performance and get improvement suggestions.
 
@@ -107,7 +100,6 @@ async def analyze_performance(
         result = await strategy_copilot_service.analyze_content_performance(
             post_data=data.post_data,
             user_id=user.id,
-            db=db,
         )
         return result
     except ValueError as exc:
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -14,6 +16,10 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Rate limiting: "redis" shares limits across API and worker processes,
+    # "memory" keeps them per process (single-process development only)
+    RATE_LIMIT_BACKEND: Literal["redis", "memory"] = "redis"
+
     # JWT
     JWT_SECRET_KEY: str = "changeme-jwt-secret"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
@@ -1,12 +1,60 @@
-from collections.abc import AsyncGenerator
+import logging
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import TypeVar
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 engine = create_async_engine(settings.DATABASE_URL, echo=settings.APP_ENV == "development")
 
-async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# ── Post-commit hooks ────────────────────────────────────────────────────────
+# Work that must only happen once a transaction is durable (e.g. handing a row
+# to Celery) registers a hook on the session. Hooks run after commit() and are
+# dropped on rollback() or close(), whoever opened the session.
+_AFTER_COMMIT = "after_commit_hooks"
+
+Hook = TypeVar("Hook", bound=Callable[[], Awaitable[None]])
+
+
+def after_commit(session: AsyncSession, key: str, factory: Callable[[], Hook]) -> Hook:
+    """Return the hook registered under ``key`` for the current transaction.
+
+    The first call creates it with ``factory``; later calls in the same
+    transaction get the same object, so a hook can collect work and run once.
+    """
+    hooks: dict[str, Callable[[], Awaitable[None]]] = session.info.setdefault(_AFTER_COMMIT, {})
+    hook = hooks.get(key)
+    if hook is None:
+        hook = hooks[key] = factory()
+    return hook
+
+
+class HookedAsyncSession(AsyncSession):
+    """AsyncSession that runs the hooks registered with after_commit()."""
+
+    async def commit(self) -> None:
+        await super().commit()
+        hooks = self.info.pop(_AFTER_COMMIT, {})
+        for key, hook in hooks.items():
+            # The transaction is already committed; a failing hook must not undo that
+            try:
+                await hook()
+            except Exception:
+                logger.exception("After-commit hook %r failed", key)
+
+    async def rollback(self) -> None:
+        self.info.pop(_AFTER_COMMIT, None)
+        await super().rollback()
+
+    async def close(self) -> None:
+        self.info.pop(_AFTER_COMMIT, None)
+        await super().close()
+
+
+async_session = async_sessionmaker(engine, class_=HookedAsyncSession, expire_on_commit=False)
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
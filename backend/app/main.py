@@ -10,6 +10,7 @@ from fastapi.staticfiles import StaticFiles
 
 from app.api.v1.router import api_router
 from app.core.config import settings
+from app.services.strategy_copilot_service import close_async_client, flush_ai_usage_log
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,6 +22,9 @@ async def lifespan(app: FastAPI):
     for subdir in ["images", "videos", "thumbnails"]:
         Path(settings.UPLOAD_DIR, subdir).mkdir(parents=True, exist_ok=True)
     yield
+    # Shutdown: persist queued AI usage rows, release pooled HTTP connections
+    await flush_ai_usage_log()
+    await close_async_client()
 
 
 app = FastAPI(
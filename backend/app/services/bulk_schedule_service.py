@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.post import Post, PostPlatform, ScheduledPost
 from app.models.social_account import SocialAccount
+from app.services.post_service import enqueue_scheduled_publish
 
 logger = logging.getLogger(__name__)
 
@@ -227,6 +228,7 @@ async def create_bulk_posts(
             )
             db.add(sp)
             await db.flush()
+            enqueue_scheduled_publish(sp, db)
 
             created += 1
 
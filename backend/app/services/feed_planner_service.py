@@ -15,6 +15,7 @@ from app.core.exceptions import BadRequestError, NotFoundError
 from app.models.media_asset import MediaAsset
 from app.models.post import Post, PostMedia, PostPlatform, ScheduledPost
 from app.models.social_account import SocialAccount
+from app.services.post_service import enqueue_scheduled_publish
 
 logger = logging.getLogger(__name__)
 
@@ -282,7 +283,9 @@ async def reorder_scheduled_posts(
         if idx > 0 and new_time <= existing_times[idx - 1]:
             new_time = existing_times[idx - 1] + timedelta(seconds=1)
 
-        sp.scheduled_time = new_time
+        if sp.scheduled_time != new_time:
+            sp.scheduled_time = new_time
+            enqueue_scheduled_publish(sp, db)
 
     await db.flush()
 
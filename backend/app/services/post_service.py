@@ -1,14 +1,18 @@
 import asyncio
-import json
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
 
-from sqlalchemy import func, select
+import orjson
+from sqlalchemy import Row, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.core.exceptions import BadRequestError, NotFoundError
 from app.core.security import decrypt_token
+from app.db.session import after_commit
 from app.models.media_asset import MediaAsset
 from app.models.post import Post, PostMedia, PostPlatform, ScheduledPost
 from app.models.social_account import SocialAccount
@@ -74,7 +78,7 @@ async def create_post(data: PostCreate, user: User, db: AsyncSession) -> Post:
     post = Post(
         user_id=user.id,
         caption=data.caption,
-        hashtags=json.dumps(data.hashtags) if data.hashtags else None,
+        hashtags=orjson.dumps(data.hashtags).decode() if data.hashtags else None,
         status="draft",
         post_type=data.post_type,
     )
@@ -87,14 +91,16 @@ async def create_post(data: PostCreate, user: User, db: AsyncSession) -> Post:
         db.add(pm)
 
     # Create platform targets
+    post_platforms = []
     for account in accounts:
         custom_caption = (data.platform_captions or {}).get(account.id)
         pp = PostPlatform(
             post_id=post.id,
-            social_account_id=account.id,
+            social_account=account,
             platform_specific_caption=custom_caption,
         )
         db.add(pp)
+        post_platforms.append(pp)
 
     await db.flush()
 
@@ -105,79 +111,82 @@ async def create_post(data: PostCreate, user: User, db: AsyncSession) -> Post:
             scheduled_time=data.schedule_time,
         )
         db.add(sp)
+        enqueue_scheduled_publish(sp, db)
         await db.flush()
     elif data.publish_now:
-        await _publish_post(post, accounts, media_assets, data.platform_captions, db)
+        await _publish_post(post, post_platforms, media_assets, data.platform_captions, db)
 
     return post
 
 
 async def _publish_post(
-    post: Post,
-    accounts: list[SocialAccount],
+    post: Post | Row,
+    post_platforms: list[PostPlatform],
     media_assets: list[MediaAsset],
     platform_captions: dict[str, str] | None,
     db: AsyncSession,
 ) -> None:
-    """Publish a post to all target platforms concurrently."""
-    post.status = "publishing"
-    await db.flush()
+    """Publish a post to all target platforms concurrently.
+
+    ``post`` only needs ``id``, ``caption``, ``hashtags`` and ``post_type``, so
+    either an ORM Post or a row from _load_post_for_publish works.
+
+    ``post_platforms`` must be attached to the session with ``social_account``
+    loaded; their statuses are updated in place, so no per-account SELECT is
+    needed while publishing or when computing the overall status.
+    """
+    await _set_post_status(post, "publishing", db)
 
     media_paths = [a.file_path for a in media_assets]
 
-    async def publish_to_account(account: SocialAccount) -> None:
+    # The hashtag suffix is identical for every account, so build it once
+    hashtag_suffix = ""
+    if post.hashtags:
+        tags = orjson.loads(post.hashtags)
+        hashtag_suffix = f"\n\n{' '.join(f'#{t}' for t in tags)}"
+
+    async def publish_to_account(pp: PostPlatform) -> None:
+        account = pp.social_account
         platform = account.platform
         acct_id = account.id
 
-        # Check daily publish limit
-        if not rate_limiter.can_publish(platform, acct_id):
-            pp_result = await db.execute(
-                select(PostPlatform).where(
-                    PostPlatform.post_id == post.id,
-                    PostPlatform.social_account_id == acct_id,
-                )
-            )
-            pp = pp_result.scalar_one()
+        # Take a daily publish slot; it is given back below if the publish fails
+        if not await rate_limiter.reserve_publish(platform, acct_id):
             pp.status = "failed"
             pp.error_message = f"Daily publish limit reached for {platform}"
             logger.warning("Daily publish limit reached for %s:%s", platform, acct_id)
             return
 
-        # Acquire rate limit slot (waits if needed)
-        await rate_limiter.acquire(platform, acct_id)
+        try:
+            # Acquire rate limit slot (waits if needed)
+            await rate_limiter.acquire(platform, acct_id)
 
-        client = get_platform_client(account)
-        caption = (platform_captions or {}).get(account.id, post.caption)
-        full_text = caption
-        if post.hashtags:
-            tags = json.loads(post.hashtags)
-            full_text = f"{caption}\n\n{' '.join(f'#{t}' for t in tags)}"
+            client = get_platform_client(account)
+            caption = (platform_captions or {}).get(account.id, post.caption)
+            full_text = f"{caption}{hashtag_suffix}"
 
-        result = await client.publish_post(
-            text=full_text,
-            media_file_paths=media_paths if media_paths else None,
-            post_type=post.post_type,
-        )
+            result = await client.publish_post(
+                text=full_text,
+                media_file_paths=media_paths if media_paths else None,
+                post_type=post.post_type,
+            )
+        except BaseException:
+            await rate_limiter.release_publish(platform, acct_id)
+            raise
 
         # Update PostPlatform record
-        pp_result = await db.execute(
-            select(PostPlatform).where(
-                PostPlatform.post_id == post.id,
-                PostPlatform.social_account_id == account.id,
-            )
-        )
-        pp = pp_result.scalar_one()
         if result.success:
             pp.status = "published"
             pp.platform_post_id = result.platform_post_id
             pp.platform_media_ids = (
-                json.dumps(result.platform_media_ids) if result.platform_media_ids else None
+                orjson.dumps(result.platform_media_ids).decode()
+                if result.platform_media_ids
+                else None
             )
             pp.published_at = datetime.now(timezone.utc)
-            # Track success in rate limiter and health monitor
-            rate_limiter.record_publish(platform, acct_id)
             health_monitor.record_publish(platform, acct_id)
         else:
+            await rate_limiter.release_publish(platform, acct_id)
             pp.status = "failed"
             pp.error_message = result.error_message
             health_monitor.record_error(platform, acct_id, result.error_message or "Unknown error")
@@ -189,48 +198,149 @@ async def _publish_post(
                 rate_limiter.record_rate_limit_hit(platform, acct_id)
 
     # Publish to all platforms concurrently
-    await asyncio.gather(*[publish_to_account(acc) for acc in accounts], return_exceptions=True)
+    await asyncio.gather(*[publish_to_account(pp) for pp in post_platforms], return_exceptions=True)
 
     # Determine overall status
-    pp_result = await db.execute(
-        select(PostPlatform).where(PostPlatform.post_id == post.id)
-    )
-    platform_statuses = list(pp_result.scalars().all())
-    statuses = [pp.status for pp in platform_statuses]
+    statuses = [pp.status for pp in post_platforms]
 
     if all(s == "published" for s in statuses):
-        post.status = "published"
+        overall_status = "published"
     elif all(s == "failed" for s in statuses):
-        post.status = "failed"
+        overall_status = "failed"
     else:
-        post.status = "published"  # partial success
+        overall_status = "published"  # partial success
 
+    await _set_post_status(post, overall_status, db)
     await db.flush()
 
 
+async def _set_post_status(post: Post | Row, status: str, db: AsyncSession) -> None:
+    if isinstance(post, Post):
+        post.status = status
+        await db.flush()
+    else:
+        # Column-only rows are immutable; write the status directly
+        await db.execute(update(Post).where(Post.id == post.id).values(status=status))
+
+
+# ── Scheduled publishing ──────────────────────────────────────────────────────
+# Scheduled posts are handed to Celery with an ETA, so the broker does the
+# waiting. Dispatches and revocations are collected by an after-commit hook on
+# the session and sent off the event loop once the transaction has committed,
+# so a worker never sees a row that was rolled back.
+
+# Only posts due within this window get an ETA task straight away; the
+# reconcile_scheduled_posts beat task dispatches later ones as they come due.
+# The broker's visibility_timeout (celery_app) must stay above it.
+DISPATCH_HORIZON = timedelta(hours=1)
+
+
+class _ScheduleChanges:
+    """Publish dispatches and revocations recorded in one transaction."""
+
+    def __init__(self) -> None:
+        self.publishes: list[tuple[str, datetime, str]] = []
+        self.revokes: list[str] = []
+
+    async def __call__(self) -> None:
+        # Broker I/O blocks (and retries when Redis is slow), so keep it off the loop
+        await asyncio.to_thread(_send_schedule_changes, self.publishes, self.revokes)
+
+
+def _schedule_changes(db: AsyncSession) -> _ScheduleChanges:
+    return after_commit(db, "scheduled_publishes", _ScheduleChanges)
+
+
+def enqueue_scheduled_publish(sp: ScheduledPost, db: AsyncSession) -> None:
+    """Queue ``sp`` for publishing at its scheduled time.
+
+    Every dispatch gets a fresh task id: Celery workers remember revoked ids,
+    so an id can never be reused once revoked. Any task queued for an earlier
+    schedule is revoked, and the publish task checks ``celery_task_id`` before
+    running, so a stale task is skipped even if the revoke is lost.
+
+    Posts further out than DISPATCH_HORIZON are left without a task id until
+    the reconcile task picks them up.
+    """
+    changes = _schedule_changes(db)
+    if sp.celery_task_id:
+        changes.revokes.append(sp.celery_task_id)
+        sp.celery_task_id = None
+    eta = sp.scheduled_time
+    if eta.tzinfo is None:
+        eta = eta.replace(tzinfo=timezone.utc)
+    if eta - datetime.now(timezone.utc) > DISPATCH_HORIZON:
+        return
+    sp.celery_task_id = f"sp:{sp.post_id}:{uuid4().hex}"
+    changes.publishes.append((sp.post_id, sp.scheduled_time, sp.celery_task_id))
+
+
+def revoke_scheduled_publish(sp: ScheduledPost, db: AsyncSession) -> None:
+    """Revoke the queued publish task for ``sp``, if any."""
+    if sp.celery_task_id:
+        _schedule_changes(db).revokes.append(sp.celery_task_id)
+        sp.celery_task_id = None
+
+
+def _send_schedule_changes(
+    publishes: list[tuple[str, datetime, str]], revokes: list[str]
+) -> None:
+    from celery import group
+
+    from app.workers.celery_app import celery_app
+    from app.workers.publish_tasks import publish_scheduled_post
+
+    if revokes:
+        celery_app.control.revoke(revokes)
+    if publishes:
+        group(
+            publish_scheduled_post.signature(args=[post_id], eta=eta, task_id=task_id)
+            for post_id, eta, task_id in publishes
+        ).apply_async()
+
+
+async def _load_post_for_publish(post_id: str, db: AsyncSession) -> Row | None:
+    """Load only the columns the publish path needs, skipping ORM instrumentation."""
+    result = await db.execute(
+        select(Post.id, Post.caption, Post.hashtags, Post.post_type, Post.status).where(
+            Post.id == post_id
+        )
+    )
+    return result.one_or_none()
+
+
 async def list_posts(
     user: User, db: AsyncSession, status: str | None = None, skip: int = 0, limit: int = 50
 ) -> tuple[list[Post], int]:
+    # The window count is evaluated before OFFSET/LIMIT, so every row carries
+    # the full match count and the page + total come back in one round-trip.
+    filters = [Post.user_id == user.id]
+    if status:
+        filters.append(Post.status == status)
+
     query = (
-        select(Post)
+        select(Post, func.count().over().label("total_count"))
+        # Only the relationships PostResponse reads; media is not part of it
         .options(
             selectinload(Post.post_platforms).selectinload(PostPlatform.social_account),
             selectinload(Post.scheduled_post),
         )
-        .where(Post.user_id == user.id)
+        .where(*filters)
+        .order_by(Post.created_at.desc())
+        .offset(skip)
+        .limit(limit)
     )
-    count_query = select(func.count()).select_from(Post).where(Post.user_id == user.id)
-
-    if status:
-        query = query.where(Post.status == status)
-        count_query = count_query.where(Post.status == status)
-
-    query = query.order_by(Post.created_at.desc()).offset(skip).limit(limit)
 
     result = await db.execute(query)
-    items = list(result.scalars().unique().all())
-    count_result = await db.execute(count_query)
-    total = count_result.scalar() or 0
+    rows = result.unique().all()
+    items = [post for post, _ in rows]
+    if rows:
+        total = rows[0].total_count
+    elif skip:
+        # A page past the end has no rows to carry the count; ask for it directly
+        total = await db.scalar(select(func.count()).select_from(Post).where(*filters))
+    else:
+        total = 0
 
     return items, total
 
@@ -240,6 +350,7 @@ async def get_post(post_id: str, user: User, db: AsyncSession) -> Post:
         select(Post)
         .options(
             selectinload(Post.post_platforms).selectinload(PostPlatform.social_account),
+            selectinload(Post.post_media).selectinload(PostMedia.media_asset),
             selectinload(Post.scheduled_post),
         )
         .where(Post.id == post_id, Post.user_id == user.id)
@@ -260,7 +371,7 @@ async def update_post(post_id: str, data: PostUpdate, user: User, db: AsyncSessi
     if data.caption is not None:
         post.caption = data.caption
     if data.hashtags is not None:
-        post.hashtags = json.dumps(data.hashtags) if data.hashtags else None
+        post.hashtags = orjson.dumps(data.hashtags).decode() if data.hashtags else None
     if data.post_type is not None:
         post.post_type = data.post_type
 
@@ -278,32 +389,40 @@ async def update_post(post_id: str, data: PostUpdate, user: User, db: AsyncSessi
             if len(media_assets) != len(data.media_ids):
                 raise BadRequestError("One or more media assets not found")
 
-        # Remove existing media links
-        existing_media = await db.execute(
-            select(PostMedia).where(PostMedia.post_id == post.id)
+        # Replace existing media links: one DELETE + one bulk INSERT
+        await db.execute(
+            delete(PostMedia)
+            .where(PostMedia.post_id == post.id)
+            .execution_options(synchronize_session=False)
         )
-        for pm in existing_media.scalars().all():
-            await db.delete(pm)
-
-        # Add new media links
-        for i, media_id in enumerate(data.media_ids):
-            pm = PostMedia(post_id=post.id, media_asset_id=media_id, position=i)
-            db.add(pm)
+        if data.media_ids:
+            await db.execute(
+                insert(PostMedia),
+                [
+                    {"post_id": post.id, "media_asset_id": media_id, "position": i}
+                    for i, media_id in enumerate(data.media_ids)
+                ],
+            )
+        # The eager-loaded collection no longer matches the rows written above.
+        # Reload it now: a lazy load on an AsyncSession would raise later.
+        await db.refresh(post, ["post_media"])
 
     # Handle schedule time changes
     if data.schedule_time is not None:
-        sp = post.scheduled_post
-        if sp:
-            # Update existing scheduled post
-            sp.scheduled_time = data.schedule_time
-            sp.status = "pending"
-        else:
-            # Create new scheduled post entry
-            sp = ScheduledPost(
-                post_id=post.id,
-                scheduled_time=data.schedule_time,
+        # Upsert on the unique post_id: one statement whether or not a row exists
+        stmt = (
+            pg_insert(ScheduledPost)
+            .values(post_id=post.id, scheduled_time=data.schedule_time, status="pending")
+            .on_conflict_do_update(
+                index_elements=[ScheduledPost.post_id],
+                set_={"scheduled_time": data.schedule_time, "status": "pending"},
             )
-            db.add(sp)
+            .returning(ScheduledPost)
+        )
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        sp = result.scalar_one()
+        set_committed_value(post, "scheduled_post", sp)
+        enqueue_scheduled_publish(sp, db)
         post.status = "scheduled"
 
     await db.flush()
@@ -320,6 +439,7 @@ async def cancel_scheduled_post(post_id: str, user: User, db: AsyncSession) -> P
     sp = post.scheduled_post
     if sp:
         sp.status = "cancelled"
+        revoke_scheduled_publish(sp, db)
 
     post.status = "draft"
     await db.flush()
@@ -1,10 +1,16 @@
-import json
+import asyncio
 import logging
+from datetime import datetime, timezone
 
+import httpx
+import orjson
 from anthropic import AsyncAnthropic
-from sqlalchemy.ext.asyncio import AsyncSession
+from anthropic.types import Message
+from pydantic import TypeAdapter
+from sqlalchemy import insert
 
 from app.core.config import settings
+from app.db.session import async_session
 from app.models.analytics import AIUsageLog
 from app.schemas.strategy import (
     ContentPillar,
@@ -39,8 +45,7 @@ formats).
 4. Balance promotional content with value-driven and community-building content.
 5. Suggest realistic posting schedules aligned with the requested frequency.
 
-CRITICAL: You MUST return ONLY valid JSON. No markdown, no code fences, no commentary \
-outside the JSON object. The response must be parseable by json.loads() directly.\
+Always deliver your answer by calling the provided tool.\
 """
 
 POST_IDEAS_SYSTEM_PROMPT = """\
@@ -48,8 +53,7 @@ You are an expert social media content creator. Generate creative, engaging post
 that align with the given strategy context. Each idea should be ready to use or easily \
 adaptable. Include platform-appropriate formatting, hashtags, and content types.
 
-CRITICAL: You MUST return ONLY valid JSON. No markdown, no code fences, no commentary \
-outside the JSON object.\
+Always deliver your answer by calling the provided tool.\
 """
 
 PERFORMANCE_ANALYSIS_SYSTEM_PROMPT = """\
@@ -57,50 +61,215 @@ You are a social media analytics expert. Analyze the provided post performance d
 extract meaningful insights and actionable recommendations. Focus on identifying patterns \
 in what works vs. what doesn't, and provide specific, data-backed suggestions for improvement.
 
-CRITICAL: You MUST return ONLY valid JSON. No markdown, no code fences, no commentary \
-outside the JSON object.\
+Always deliver your answer by calling the provided tool.\
 """
 
+# Tool definitions force schema-conformant output; input schemas come from the
+# response models, so the tool input can be validated directly without JSON parsing.
+STRATEGY_TOOL = {
+    "name": "emit_strategy",
+    "description": "Return the complete social media content strategy.",
+    "input_schema": StrategyResponse.model_json_schema(),
+}
+
+POST_IDEAS_TOOL = {
+    "name": "emit_post_ideas",
+    "description": "Return the generated post ideas.",
+    "input_schema": PostIdeasResponse.model_json_schema(),
+}
+
+PERFORMANCE_ANALYSIS_TOOL = {
+    "name": "emit_performance_analysis",
+    "description": "Return the performance insights and recommendations.",
+    "input_schema": PerformanceAnalysisResponse.model_json_schema(),
+}
+
+
+# Batch validators: one pydantic-core call per list instead of one per item
+_PILLARS_ADAPTER = TypeAdapter(list[ContentPillar])
+_WEEKLY_SLOTS_ADAPTER = TypeAdapter(list[WeeklySlot])
+
+
+# Engagement counts are sent as integers; other fields pass through unchanged
+_COUNT_METRICS = frozenset(
+    {"likes", "comments", "shares", "saves", "impressions", "reach", "views", "clicks"}
+)
+
+
+def _to_columnar(rows: list[dict]) -> dict:
+    """Reshape row dicts into ``{"fields": [...], "rows": [[...], ...]}``.
+
+    Field names are sent once instead of per post, which cuts prompt tokens
+    substantially for metric-heavy payloads. Missing values become null.
+    """
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    return {
+        "fields": fields,
+        "rows": [[_compact_value(field, row.get(field)) for field in fields] for row in rows],
+    }
+
+
+def _compact_value(field: str, value):
+    if field in _COUNT_METRICS and isinstance(value, float):
+        return round(value)
+    return value
+
+
+# Shared client so the underlying HTTP connection pool is reused across calls
+_client: AsyncAnthropic | None = None
+
 
 def _get_async_client() -> AsyncAnthropic:
-    return AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    global _client
+    if _client is None:
+        _client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            max_retries=2,
+            timeout=httpx.Timeout(60.0),
+        )
+    return _client
+
+
+async def close_async_client() -> None:
+    """Close the shared Anthropic client (called on application shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
 
 
-def _strip_json_fences(text: str) -> str:
-    """Remove markdown code fences that LLMs sometimes add despite instructions."""
-    stripped = text.strip()
-    if stripped.startswith("```"):
-        # Remove opening fence (```json or ```)
-        first_newline = stripped.index("\n")
-        stripped = stripped[first_newline + 1 :]
-    if stripped.endswith("```"):
-        stripped = stripped[: -3]
-    return stripped.strip()
+async def _stream_tool_call(
+    client: AsyncAnthropic, model: str, system: str, user_prompt: str, tool: dict
+) -> tuple[dict | None, Message]:
+    """Stream a completion that must answer through ``tool``.
+
+    Returns the tool input (None if the model stopped before calling the tool)
+    and the final message, which carries token usage.
+    """
+    async with client.messages.stream(
+        model=model,
+        max_tokens=settings.AI_MAX_TOKENS,
+        system=system,
+        messages=[{"role": "user", "content": user_prompt}],
+        tools=[tool],
+        tool_choice={"type": "tool", "name": tool["name"]},
+    ) as stream:
+        message = await stream.get_final_message()
+
+    tool_input = next(
+        (block.input for block in message.content if block.type == "tool_use"), None
+    )
+    return tool_input, message
+
+
+# ── AI usage logging ─────────────────────────────────────────────────────────
+# Usage rows are queued and written in batches by a background task using its
+# own session, so AI requests never wait on a flush for bookkeeping.
+_AI_LOG_BATCH_SIZE = 50
+_AI_LOG_FLUSH_INTERVAL = 0.1  # seconds
+
+_ai_log_queue: asyncio.Queue[dict] | None = None
+_ai_log_writer: asyncio.Task | None = None
+
+
+def _ensure_ai_log_writer() -> asyncio.Queue[dict]:
+    """Start the background usage-log writer on the running loop if needed."""
+    global _ai_log_queue, _ai_log_writer
+    loop = asyncio.get_running_loop()
+    if _ai_log_writer is None or _ai_log_writer.done() or _ai_log_writer.get_loop() is not loop:
+        _ai_log_queue = asyncio.Queue()
+        _ai_log_writer = loop.create_task(_run_ai_log_writer(_ai_log_queue))
+    return _ai_log_queue
+
+
+async def _next_ai_log_batch(queue: asyncio.Queue[dict]) -> list[dict]:
+    """Wait for one entry, then collect more until the batch is full or the interval ends."""
+    loop = asyncio.get_running_loop()
+    batch = [await queue.get()]
+    deadline = loop.time() + _AI_LOG_FLUSH_INTERVAL
+    while len(batch) < _AI_LOG_BATCH_SIZE:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except TimeoutError:
+            break
+    return batch
 
 
-async def _log_ai_usage(
-    db: AsyncSession,
+async def _write_ai_log_batch(batch: list[dict]) -> None:
+    """Insert a batch in one statement, falling back to row by row if it fails."""
+    try:
+        async with async_session() as session:
+            await session.execute(insert(AIUsageLog), batch)
+            await session.commit()
+        return
+    except Exception:
+        logger.warning(
+            "Batch insert of %d AI usage log entries failed, retrying row by row",
+            len(batch),
+            exc_info=True,
+        )
+
+    # One bad row (e.g. its user was deleted meanwhile) must not drop the rest;
+    # a savepoint per row keeps the transaction usable after a failure
+    async with async_session() as session:
+        for row in batch:
+            try:
+                async with session.begin_nested():
+                    await session.execute(insert(AIUsageLog), [row])
+            except Exception:
+                logger.exception("Failed to write AI usage log entry for user %s", row["user_id"])
+        await session.commit()
+
+
+async def _run_ai_log_writer(queue: asyncio.Queue[dict]) -> None:
+    while True:
+        batch = await _next_ai_log_batch(queue)
+        try:
+            await _write_ai_log_batch(batch)
+        except Exception:
+            logger.exception("Failed to write %d AI usage log entries", len(batch))
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+async def flush_ai_usage_log() -> None:
+    """Write any queued usage rows and stop the writer (called on application shutdown)."""
+    global _ai_log_queue, _ai_log_writer
+    if _ai_log_writer is None or _ai_log_writer.done():
+        return
+    if _ai_log_writer.get_loop() is asyncio.get_running_loop():
+        await _ai_log_queue.join()
+    _ai_log_writer.cancel()
+    _ai_log_queue = _ai_log_writer = None
+
+
+def _log_ai_usage(
     user_id: str,
     action_type: str,
     input_tokens: int,
     output_tokens: int,
     model: str,
 ) -> None:
-    log_entry = AIUsageLog(
-        user_id=user_id,
-        action_type=action_type,
-        input_tokens=input_tokens,
-        output_tokens=output_tokens,
-        model=model,
+    """Queue a usage row without waiting on the database; see _run_ai_log_writer."""
+    _ensure_ai_log_writer().put_nowait(
+        {
+            "user_id": user_id,
+            "action_type": action_type,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "model": model,
+            "created_at": datetime.now(timezone.utc),
+        }
     )
-    db.add(log_entry)
-    await db.flush()
 
 
 async def generate_content_strategy(
     answers: dict,
     user_id: str,
-    db: AsyncSession,
 ) -> dict:
     """Generate a comprehensive content strategy from questionnaire answers.
 
@@ -108,7 +277,6 @@ async def generate_content_strategy(
         answers: Questionnaire data containing business_type, target_audience,
                  goals, platforms, tone, posting_frequency, and optional content_pillars.
         user_id: ID of the requesting user.
-        db: Async database session.
 
     Returns:
         Structured dict matching StrategyResponse schema.
@@ -140,46 +308,13 @@ Desired Posting Frequency: {answers['posting_frequency']}
 
 {pillars_instruction}
 
-Return a JSON object with EXACTLY this structure:
-{{
-    "pillars": [
-        {{
-            "name": "Pillar Name",
-            "description": "What this pillar covers and why it matters",
-            "percentage": 30,
-            "sample_topics": ["Topic 1", "Topic 2", "Topic 3"]
-        }}
-    ],
-    "weekly_schedule": [
-        {{
-            "day_of_week": "Monday",
-            "time": "09:00",
-            "pillar": "Pillar Name",
-            "post_type": "carousel/reel/story/text/image/video/thread"
-        }}
-    ],
-    "post_ideas": [
-        {{
-            "pillar": "Pillar Name",
-            "title": "Post Idea Title",
-            "description": "Brief description of the post concept",
-            "platform": "instagram",
-            "post_type": "carousel"
-        }}
-    ],
-    "hashtag_strategy": {{
-        "platform_name": ["hashtag1", "hashtag2", "hashtag3"]
-    }},
-    "growth_tactics": [
-        "Specific actionable tactic for growth"
-    ]
-}}
-
 Requirements:
 - Pillar percentages must sum to 100.
 - Weekly schedule should match the requested posting frequency of \
 "{answers['posting_frequency']}".
-- Provide 3-5 post ideas per pillar.
+- Provide 3-5 post ideas per pillar, each with pillar, title, description, platform \
+and post_type (carousel/reel/story/text/image/video/thread).
+- Hashtag strategy maps each platform name to its list of hashtags.
 - Hashtag strategy must include entries for each platform: \
 {', '.join(answers['platforms'])}.
 - Provide at least 5 growth tactics specific to the selected platforms.
@@ -188,15 +323,11 @@ Requirements:
 """
 
     model = settings.AI_MODEL
-    message = await client.messages.create(
-        model=model,
-        max_tokens=settings.AI_MAX_TOKENS,
-        system=STRATEGY_SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_prompt}],
+    result, message = await _stream_tool_call(
+        client, model, STRATEGY_SYSTEM_PROMPT, user_prompt, STRATEGY_TOOL
     )
 
-    await _log_ai_usage(
-        db=db,
+    _log_ai_usage(
         user_id=user_id,
         action_type="strategy_generate",
         input_tokens=message.usage.input_tokens,
@@ -204,21 +335,16 @@ Requirements:
         model=model,
     )
 
-    raw_text = message.content[0].text
-    cleaned = _strip_json_fences(raw_text)
-
-    try:
-        result = json.loads(cleaned)
-    except json.JSONDecodeError:
-        logger.error("Failed to parse strategy JSON from Claude: %s", raw_text[:500])
+    if result is None:
+        logger.error("Claude returned no strategy tool call (stop_reason=%s)", message.stop_reason)
         raise ValueError(
             "The AI returned an invalid response. Please try again."
         )
 
     # Validate and structure the response through Pydantic models
     try:
-        pillars = [ContentPillar(**p) for p in result.get("pillars", [])]
-        weekly_schedule = [WeeklySlot(**s) for s in result.get("weekly_schedule", [])]
+        pillars = _PILLARS_ADAPTER.validate_python(result.get("pillars", []))
+        weekly_schedule = _WEEKLY_SLOTS_ADAPTER.validate_python(result.get("weekly_schedule", []))
     except Exception as exc:
         logger.error("Failed to validate strategy structure: %s", exc)
         raise ValueError(
@@ -239,7 +365,6 @@ async def generate_post_ideas(
     count: int,
     platform: str,
     user_id: str,
-    db: AsyncSession,
 ) -> list[dict]:
     """Generate specific post ideas based on an existing strategy.
 
@@ -248,7 +373,6 @@ async def generate_post_ideas(
         count: Number of post ideas to generate.
         platform: Target platform for the ideas.
         user_id: ID of the requesting user.
-        db: Async database session.
 
     Returns:
         List of dicts, each containing caption, hashtags, post_type, and platform.
@@ -262,19 +386,9 @@ for {platform}.
 Strategy Context:
 {strategy_context}
 
-Return a JSON object with EXACTLY this structure:
-{{
-    "ideas": [
-        {{
-            "caption": "Full ready-to-post caption text",
-            "hashtags": ["hashtag1", "hashtag2", "hashtag3"],
-            "post_type": "carousel/reel/story/text/image/video/thread",
-            "platform": "{platform}"
-        }}
-    ]
-}}
-
 Requirements:
+- Set platform to "{platform}" and post_type to one of \
+carousel/reel/story/text/image/video/thread.
 - Each caption should be platform-appropriate in length and style.
 - Include 5-15 relevant hashtags per post (no # symbol).
 - Vary post types to keep the feed dynamic.
@@ -285,15 +399,11 @@ Requirements:
 """
 
     model = settings.AI_MODEL
-    message = await client.messages.create(
-        model=model,
-        max_tokens=settings.AI_MAX_TOKENS,
-        system=POST_IDEAS_SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_prompt}],
+    result, message = await _stream_tool_call(
+        client, model, POST_IDEAS_SYSTEM_PROMPT, user_prompt, POST_IDEAS_TOOL
     )
 
-    await _log_ai_usage(
-        db=db,
+    _log_ai_usage(
         user_id=user_id,
         action_type="strategy_post_ideas",
         input_tokens=message.usage.input_tokens,
@@ -301,13 +411,10 @@ Requirements:
         model=model,
     )
 
-    raw_text = message.content[0].text
-    cleaned = _strip_json_fences(raw_text)
-
-    try:
-        result = json.loads(cleaned)
-    except json.JSONDecodeError:
-        logger.error("Failed to parse post ideas JSON from Claude: %s", raw_text[:500])
+    if result is None:
+        logger.error(
+            "Claude returned no post ideas tool call (stop_reason=%s)", message.stop_reason
+        )
         raise ValueError(
             "The AI returned an invalid response. Please try again."
         )
@@ -315,7 +422,7 @@ Requirements:
     ideas = []
     for item in result.get("ideas", []):
         try:
-            idea = PostIdea(**item)
+            idea = PostIdea.model_validate(item)
             ideas.append(idea.model_dump())
         except Exception:
             # Skip malformed entries but keep valid ones
@@ -328,7 +435,6 @@ Requirements:
 async def analyze_content_performance(
     post_data: list[dict],
     user_id: str,
-    db: AsyncSession,
 ) -> dict:
     """Analyze past post performance and suggest improvements.
 
@@ -336,7 +442,6 @@ async def analyze_content_performance(
         post_data: List of dicts with post content and metrics
                    (likes, comments, shares, impressions, etc.).
         user_id: ID of the requesting user.
-        db: Async database session.
 
     Returns:
         Dict matching PerformanceAnalysisResponse with insights,
@@ -345,30 +450,18 @@ async def analyze_content_performance(
     client = _get_async_client()
 
     # Truncate post data to avoid exceeding token limits while keeping enough context
-    serialized_data = json.dumps(post_data[:50], default=str)
+    serialized_data = orjson.dumps(_to_columnar(post_data[:50]), default=str).decode()
 
     user_prompt = f"""\
 Analyze the following social media post performance data and provide actionable insights.
 
-Post Performance Data (each entry contains post content/type and engagement metrics):
+Post Performance Data in columnar form: "fields" names the columns and each entry in \
+"rows" is one post (content/type and engagement metrics) with values in that order:
 {serialized_data}
 
-Return a JSON object with EXACTLY this structure:
-{{
-    "insights": [
-        "Insight about patterns in the data (e.g., 'Carousel posts generate 3x more \
-saves than single images')"
-    ],
-    "recommendations": [
-        "Specific actionable recommendation to improve performance"
-    ],
-    "top_performing_types": [
-        "content type or category that performs best"
-    ]
-}}
-
 Requirements:
-- Provide 5-10 data-driven insights based on the actual numbers.
+- Provide 5-10 data-driven insights based on the actual numbers (e.g., "Carousel posts \
+generate 3x more saves than single images").
 - Provide 5-8 specific, actionable recommendations.
 - Identify 3-5 top-performing content types or themes.
 - Reference actual metrics and patterns you observe.
@@ -378,15 +471,11 @@ Requirements:
 """
 
     model = settings.AI_MODEL
-    message = await client.messages.create(
-        model=model,
-        max_tokens=settings.AI_MAX_TOKENS,
-        system=PERFORMANCE_ANALYSIS_SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_prompt}],
+    result, message = await _stream_tool_call(
+        client, model, PERFORMANCE_ANALYSIS_SYSTEM_PROMPT, user_prompt, PERFORMANCE_ANALYSIS_TOOL
     )
 
-    await _log_ai_usage(
-        db=db,
+    _log_ai_usage(
         user_id=user_id,
         action_type="strategy_analyze",
         input_tokens=message.usage.input_tokens,
@@ -394,19 +483,14 @@ Requirements:
         model=model,
     )
 
-    raw_text = message.content[0].text
-    cleaned = _strip_json_fences(raw_text)
-
-    try:
-        result = json.loads(cleaned)
-    except json.JSONDecodeError:
-        logger.error("Failed to parse analysis JSON from Claude: %s", raw_text[:500])
+    if result is None:
+        logger.error("Claude returned no analysis tool call (stop_reason=%s)", message.stop_reason)
         raise ValueError(
             "The AI returned an invalid response. Please try again."
         )
 
     try:
-        response = PerformanceAnalysisResponse(**result)
+        response = PerformanceAnalysisResponse.model_validate(result)
     except Exception as exc:
         logger.error("Failed to validate analysis structure: %s", exc)
         raise ValueError(
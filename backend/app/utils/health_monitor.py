@@ -16,7 +16,7 @@ class HealthStatus(str, Enum):
     DISCONNECTED = "disconnected"  # Needs re-auth
 
 
-@dataclass
+@dataclass(slots=True)
 class AccountHealth:
     account_id: str
     platform: str
@@ -88,19 +88,24 @@ class HealthMonitor:
         if expires_at:
             health.token_expires_at = expires_at.timestamp()
             # Warn if expiring within 24 hours
-            hours_left = (expires_at.timestamp() - time.time()) / 3600
+            hours_left = (health.token_expires_at - time.time()) / 3600
             if hours_left < 0:
                 health.status = HealthStatus.DISCONNECTED
             elif hours_left < 24:
                 health.status = HealthStatus.WARNING
 
-    def get_health(self, platform: str, account_id: str) -> dict:
-        """Get health status for a single account."""
+    def get_health(self, platform: str, account_id: str, now: float | None = None) -> dict:
+        """Get health status for a single account.
+
+        ``now`` lets callers reporting on many accounts read the clock once.
+        """
         health = self._get_or_create(platform, account_id)
 
         # Check token expiry
         if health.token_expires_at:
-            hours_left = (health.token_expires_at - time.time()) / 3600
+            if now is None:
+                now = time.time()
+            hours_left = (health.token_expires_at - now) / 3600
             if hours_left < 0:
                 health.status = HealthStatus.DISCONNECTED
             elif hours_left < 24 and health.status == HealthStatus.HEALTHY:
@@ -127,18 +132,26 @@ class HealthMonitor:
             "total_publishes": health.total_publishes,
         }
 
-    def get_all_health(self) -> list[dict]:
+    def get_all_health(self, now: float | None = None) -> list[dict]:
         """Get health of all tracked accounts."""
+        if now is None:
+            now = time.time()
         return [
-            self.get_health(h.platform, h.account_id) for h in self._accounts.values()
+            self.get_health(h.platform, h.account_id, now) for h in self._accounts.values()
         ]
 
-    def get_accounts_needing_attention(self) -> list[dict]:
+    def get_accounts_needing_attention(self, now: float | None = None) -> list[dict]:
         """Get accounts that are warning, error, or disconnected."""
+        if now is None:
+            now = time.time()
+        # A token running out within 24h needs attention even if nothing has
+        # read this account's health (and downgraded its status) since
+        horizon = now + 24 * 3600
         return [
-            self.get_health(h.platform, h.account_id)
+            self.get_health(h.platform, h.account_id, now)
             for h in self._accounts.values()
             if h.status != HealthStatus.HEALTHY
+            or (h.token_expires_at and h.token_expires_at < horizon)
         ]
 
     def remove_account(self, platform: str, account_id: str) -> None:
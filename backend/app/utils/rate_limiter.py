@@ -1,15 +1,25 @@
 """
 Per-platform API rate limiter with sliding window tracking.
 Prevents hitting platform rate limits and implements exponential backoff.
+
+Two implementations share one interface: RateLimiter keeps state in process
+memory, RedisRateLimiter keeps windows and daily counts in Redis so that the
+API server and every Celery worker draw from the same per-account budget.
 """
 
 import asyncio
+import contextlib
 import time
+import uuid
 from collections import defaultdict
 from dataclasses import dataclass, field
 
+from redis.asyncio import Redis
+
+from app.core.config import settings
 
-@dataclass
+
+@dataclass(slots=True)
 class PlatformLimits:
     """Rate limit configuration per platform."""
     max_requests: int
@@ -44,59 +54,100 @@ PLATFORM_RATE_LIMITS: dict[str, PlatformLimits] = {
 
 
 class SlidingWindowCounter:
-    """Track API calls within a sliding time window."""
+    """Track API calls within a sliding time window.
+
+    Uses the sliding-window-counter approximation: only the counts for the
+    current fixed window and the one before it are kept, and the previous
+    count is weighted by how much of it still overlaps the sliding window.
+    State is O(1) per key no matter how large max_requests is.
+    """
+
+    __slots__ = (
+        "max_requests",
+        "window_seconds",
+        "prev_count",
+        "curr_count",
+        "curr_window_start",
+    )
 
     def __init__(self, max_requests: int, window_seconds: int):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.timestamps: list[float] = []
-
-    def _cleanup(self) -> None:
-        """Remove expired timestamps."""
-        cutoff = time.time() - self.window_seconds
-        self.timestamps = [ts for ts in self.timestamps if ts > cutoff]
-
-    def can_proceed(self) -> bool:
+        self.prev_count = 0
+        self.curr_count = 0
+        self.curr_window_start = 0.0
+
+    # Public methods take an optional ``now`` so one time.time() call can cover
+    # a whole check-and-record decision.
+
+    def _roll(self, now: float | None = None) -> float:
+        """Advance to the fixed window containing ``now`` (default: current time) and return it."""
+        if now is None:
+            now = time.time()
+        window_start = (now // self.window_seconds) * self.window_seconds
+        if window_start != self.curr_window_start:
+            # Only the window directly before the current one still overlaps
+            if window_start - self.curr_window_start == self.window_seconds:
+                self.prev_count = self.curr_count
+            else:
+                self.prev_count = 0
+            self.curr_count = 0
+            self.curr_window_start = window_start
+        return now
+
+    def _estimate(self, now: float) -> float:
+        """Estimated number of calls in the sliding window ending at ``now``."""
+        elapsed = (now - self.curr_window_start) / self.window_seconds
+        return self.curr_count + self.prev_count * (1 - elapsed)
+
+    def can_proceed(self, now: float | None = None) -> bool:
         """Check if we can make another request."""
-        self._cleanup()
-        return len(self.timestamps) < self.max_requests
+        now = self._roll(now)
+        return self._estimate(now) < self.max_requests
 
-    def record(self) -> None:
+    def record(self, now: float | None = None) -> None:
         """Record a new request."""
-        self.timestamps.append(time.time())
+        self._roll(now)
+        self.curr_count += 1
 
-    def time_until_available(self) -> float:
+    def time_until_available(self, now: float | None = None) -> float:
         """Seconds until next request slot opens."""
-        self._cleanup()
-        if len(self.timestamps) < self.max_requests:
+        now = self._roll(now)
+        if self._estimate(now) < self.max_requests:
             return 0.0
-        oldest = self.timestamps[0]
-        return max(0.0, oldest + self.window_seconds - time.time())
+        if self.curr_count < self.max_requests:
+            # Wait for the previous window's weight to decay below the headroom left
+            fraction = 1 - (self.max_requests - self.curr_count) / self.prev_count
+            return max(0.0, self.curr_window_start + fraction * self.window_seconds - now)
+        # Current window is full: it must roll over and then decay in turn
+        fraction = 1 - self.max_requests / self.curr_count
+        return self.curr_window_start + (1 + fraction) * self.window_seconds - now
 
     @property
     def current_count(self) -> int:
-        self._cleanup()
-        return len(self.timestamps)
+        now = self._roll()
+        return round(self._estimate(now))
 
     @property
     def remaining(self) -> int:
-        self._cleanup()
-        return max(0, self.max_requests - len(self.timestamps))
+        return max(0, self.max_requests - self.current_count)
 
 
 class DailyCounter:
-    """Track daily publish counts per account."""
+    """Track daily publish counts per account (days roll over at UTC midnight)."""
+
+    __slots__ = ("max_per_day", "count", "reset_epoch")
 
     def __init__(self, max_per_day: int):
         self.max_per_day = max_per_day
         self.count = 0
-        self.reset_date: str = ""
+        self.reset_epoch = 0.0  # next UTC midnight, as a Unix timestamp
 
     def _check_reset(self) -> None:
-        today = time.strftime("%Y-%m-%d")
-        if self.reset_date != today:
+        now = time.time()
+        if now >= self.reset_epoch:
             self.count = 0
-            self.reset_date = today
+            self.reset_epoch = (now // 86400 + 1) * 86400
 
     def can_publish(self) -> bool:
         self._check_reset()
@@ -106,6 +157,10 @@ class DailyCounter:
         self._check_reset()
         self.count += 1
 
+    def release_publish(self) -> None:
+        self._check_reset()
+        self.count = max(0, self.count - 1)
+
     @property
     def remaining(self) -> int:
         self._check_reset()
@@ -122,54 +177,70 @@ class RateLimiter:
         self._api_windows: dict[str, SlidingWindowCounter] = {}
         self._daily_counters: dict[str, DailyCounter] = {}
         self._backoff_until: dict[str, float] = {}
+        self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
 
     def _get_key(self, platform: str, account_id: str) -> str:
         return f"{platform}:{account_id}"
 
     def _get_window(self, platform: str, account_id: str) -> SlidingWindowCounter:
         key = self._get_key(platform, account_id)
-        if key not in self._api_windows:
-            limits = PLATFORM_RATE_LIMITS.get(platform, PLATFORM_RATE_LIMITS["twitter"])
-            self._api_windows[key] = SlidingWindowCounter(
+        window = self._api_windows.get(key)
+        if window is None:
+            limits = PLATFORM_RATE_LIMITS.get(platform) or PLATFORM_RATE_LIMITS["twitter"]
+            window = self._api_windows[key] = SlidingWindowCounter(
                 limits.max_requests, limits.window_seconds
             )
-        return self._api_windows[key]
+        return window
 
     def _get_daily(self, platform: str, account_id: str) -> DailyCounter:
         key = self._get_key(platform, account_id)
-        if key not in self._daily_counters:
-            limits = PLATFORM_RATE_LIMITS.get(platform, PLATFORM_RATE_LIMITS["twitter"])
-            self._daily_counters[key] = DailyCounter(limits.max_publishes_per_day)
-        return self._daily_counters[key]
+        daily = self._daily_counters.get(key)
+        if daily is None:
+            limits = PLATFORM_RATE_LIMITS.get(platform) or PLATFORM_RATE_LIMITS["twitter"]
+            daily = self._daily_counters[key] = DailyCounter(limits.max_publishes_per_day)
+        return daily
 
     async def acquire(self, platform: str, account_id: str) -> None:
         """
         Wait until it's safe to make an API call.
         Blocks if rate limited, respects backoff.
         """
-        key = self._get_key(platform, account_id)
-
-        # Check backoff
-        backoff_until = self._backoff_until.get(key, 0)
-        if time.time() < backoff_until:
-            wait = backoff_until - time.time()
-            await asyncio.sleep(wait)
+        await self._wait_for_backoff(platform, account_id)
 
         window = self._get_window(platform, account_id)
-        while not window.can_proceed():
-            wait = window.time_until_available()
-            if wait > 0:
-                await asyncio.sleep(min(wait + 0.5, 60))
+        lock = self._locks[self._get_key(platform, account_id)]
+        while True:
+            # Decide under the lock, but sleep outside it so other waiters
+            # for this account are not queued behind a sleeping coroutine
+            async with lock:
+                now = time.time()
+                if window.can_proceed(now):
+                    window.record(now)
+                    return
+                wait = window.time_until_available(now)
+            await asyncio.sleep(min(wait + 0.5, 60))
+
+    async def _wait_for_backoff(self, platform: str, account_id: str) -> None:
+        backoff_until = self._backoff_until.get(self._get_key(platform, account_id), 0)
+        wait = backoff_until - time.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
 
-        window.record()
+    async def reserve_publish(self, platform: str, account_id: str) -> bool:
+        """Take one of today's publish slots for this account.
 
-    def can_publish(self, platform: str, account_id: str) -> bool:
-        """Check if this account can publish today."""
-        return self._get_daily(platform, account_id).can_publish()
+        Returns False, without taking a slot, once the daily limit is reached.
+        Call release_publish() if the publish then fails.
+        """
+        daily = self._get_daily(platform, account_id)
+        if not daily.can_publish():
+            return False
+        daily.record_publish()
+        return True
 
-    def record_publish(self, platform: str, account_id: str) -> None:
-        """Record a successful publish."""
-        self._get_daily(platform, account_id).record_publish()
+    async def release_publish(self, platform: str, account_id: str) -> None:
+        """Give back a slot taken by reserve_publish() for a failed publish."""
+        self._get_daily(platform, account_id).release_publish()
 
     def record_rate_limit_hit(
         self, platform: str, account_id: str, retry_after: float | None = None
@@ -178,21 +249,23 @@ class RateLimiter:
         key = self._get_key(platform, account_id)
         current_backoff = self._backoff_until.get(key, 0)
         limits = PLATFORM_RATE_LIMITS.get(platform, PLATFORM_RATE_LIMITS["twitter"])
+        now = time.time()
 
         if retry_after:
-            self._backoff_until[key] = time.time() + retry_after
+            self._backoff_until[key] = now + retry_after
         else:
             # Exponential backoff: double each time, max 5 minutes
-            elapsed = max(1.0, current_backoff - time.time()) if current_backoff > time.time() else 1.0
+            elapsed = max(1.0, current_backoff - now)
             next_backoff = min(elapsed * limits.backoff_base, 300)
-            self._backoff_until[key] = time.time() + next_backoff
+            self._backoff_until[key] = now + next_backoff
 
-    def get_status(self, platform: str, account_id: str) -> dict:
+    async def get_status(self, platform: str, account_id: str) -> dict:
         """Get current rate limit status for an account."""
         window = self._get_window(platform, account_id)
         daily = self._get_daily(platform, account_id)
         key = self._get_key(platform, account_id)
         backoff_until = self._backoff_until.get(key, 0)
+        now = time.time()
 
         return {
             "platform": platform,
@@ -200,21 +273,174 @@ class RateLimiter:
             "api_calls_remaining": window.remaining,
             "api_calls_used": window.current_count,
             "publishes_remaining_today": daily.remaining,
-            "is_backing_off": time.time() < backoff_until,
-            "backoff_seconds_left": max(0, backoff_until - time.time()),
+            "is_backing_off": now < backoff_until,
+            "backoff_seconds_left": max(0, backoff_until - now),
         }
 
-    def get_all_statuses(self) -> list[dict]:
+    async def get_all_statuses(self) -> list[dict]:
         """Get rate limit status for all tracked accounts."""
-        seen = set()
         statuses = []
-        for key in list(self._api_windows.keys()) | set(self._daily_counters.keys()):
-            if key not in seen:
-                seen.add(key)
-                platform, account_id = key.split(":", 1)
-                statuses.append(self.get_status(platform, account_id))
+        for key in self._api_windows.keys() | self._daily_counters.keys():
+            platform, account_id = key.split(":", 1)
+            statuses.append(await self.get_status(platform, account_id))
         return statuses
 
 
+# Scripts read the clock with TIME, so every API and worker host scores
+# entries against the same (Redis server) clock however far theirs drift.
+
+# Sliding log per key: prune expired entries, then either record the call
+# atomically or return the seconds until the oldest entry leaves the window.
+# Results are strings because Redis truncates Lua numbers to integers.
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local window = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('EXPIRE', KEYS[1], math.ceil(window))
+    return '0'
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return tostring(tonumber(oldest[2]) + window - now)
+"""
+
+# Daily publish counter: take a slot only while under the limit. The key
+# expires at the next UTC midnight, set when the day's first slot is taken.
+_RESERVE_PUBLISH_SCRIPT = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    local now = tonumber(redis.call('TIME')[1])
+    redis.call('EXPIREAT', KEYS[1], (math.floor(now / 86400) + 1) * 86400)
+end
+if count > tonumber(ARGV[1]) then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+return 1
+"""
+
+# Give a slot back, unless the day has rolled over and the key is gone
+_RELEASE_PUBLISH_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') > 0 then
+    redis.call('DECR', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Rate limiter whose API windows and daily publish counts live in Redis.
+
+    Window and daily-limit checks each run as a single Lua script that also
+    takes the slot, so concurrent callers across processes cannot both take
+    the last one. get_status()/get_all_statuses() read the counts back from
+    Redis; only backoff after a 429 stays per process.
+    """
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        self._redis_url = redis_url
+        self._redis: Redis | None = None
+        self._redis_loop: asyncio.AbstractEventLoop | None = None
+        self._acquire_script = None
+        self._reserve_publish_script = None
+        self._release_publish_script = None
+
+    async def _client(self) -> Redis:
+        # redis.asyncio connections are bound to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            if self._redis is not None:
+                # Best effort: the old loop may already be closed
+                with contextlib.suppress(Exception):
+                    await self._redis.aclose()
+            self._redis = Redis.from_url(self._redis_url)
+            self._redis_loop = loop
+            self._acquire_script = self._redis.register_script(_ACQUIRE_SCRIPT)
+            self._reserve_publish_script = self._redis.register_script(_RESERVE_PUBLISH_SCRIPT)
+            self._release_publish_script = self._redis.register_script(_RELEASE_PUBLISH_SCRIPT)
+        return self._redis
+
+    async def acquire(self, platform: str, account_id: str) -> None:
+        """
+        Wait until it's safe to make an API call.
+        Blocks if rate limited, respects backoff.
+        """
+        await self._wait_for_backoff(platform, account_id)
+
+        redis = await self._client()
+        limits = PLATFORM_RATE_LIMITS.get(platform, PLATFORM_RATE_LIMITS["twitter"])
+        key = f"rl:{platform}:{account_id}"
+        while True:
+            args = [limits.window_seconds, limits.max_requests, uuid.uuid4().hex]
+            wait = float(await self._acquire_script(keys=[key], args=args, client=redis))
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait + 0.5, 60))
+
+    async def reserve_publish(self, platform: str, account_id: str) -> bool:
+        """Take one of today's publish slots for this account.
+
+        Returns False, without taking a slot, once the daily limit is reached.
+        The counter expires at the next UTC midnight.
+        """
+        redis = await self._client()
+        limits = PLATFORM_RATE_LIMITS.get(platform, PLATFORM_RATE_LIMITS["twitter"])
+        reserved = await self._reserve_publish_script(
+            keys=[f"rl:daily:{platform}:{account_id}"],
+            args=[limits.max_publishes_per_day],
+            client=redis,
+        )
+        return bool(reserved)
+
+    async def release_publish(self, platform: str, account_id: str) -> None:
+        """Give back a slot taken by reserve_publish() for a failed publish."""
+        redis = await self._client()
+        await self._release_publish_script(keys=[f"rl:daily:{platform}:{account_id}"], client=redis)
+
+    async def get_status(self, platform: str, account_id: str) -> dict:
+        """Get current rate limit status for an account, as stored in Redis."""
+        redis = await self._client()
+        limits = PLATFORM_RATE_LIMITS.get(platform, PLATFORM_RATE_LIMITS["twitter"])
+        seconds, micros = await redis.time()
+        window_start = seconds + micros / 1_000_000 - limits.window_seconds
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zcount(f"rl:{platform}:{account_id}", f"({window_start}", "+inf")
+            pipe.get(f"rl:daily:{platform}:{account_id}")
+            used, published = await pipe.execute()
+
+        backoff_until = self._backoff_until.get(self._get_key(platform, account_id), 0)
+        now = time.time()
+        return {
+            "platform": platform,
+            "account_id": account_id,
+            "api_calls_remaining": max(0, limits.max_requests - used),
+            "api_calls_used": used,
+            "publishes_remaining_today": max(0, limits.max_publishes_per_day - int(published or 0)),
+            "is_backing_off": now < backoff_until,
+            "backoff_seconds_left": max(0, backoff_until - now),
+        }
+
+    async def get_all_statuses(self) -> list[dict]:
+        """Get rate limit status for every account with a window or daily key in Redis."""
+        redis = await self._client()
+        accounts = set()
+        async for key in redis.scan_iter(match="rl:*", count=500):
+            _, rest = key.decode().split(":", 1)
+            if rest.startswith("daily:"):
+                rest = rest.removeprefix("daily:")
+            accounts.add(tuple(rest.split(":", 1)))
+        return [await self.get_status(platform, account_id) for platform, account_id in accounts]
+
+
+def _build_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimiter(settings.REDIS_URL)
+    return RateLimiter()
+
+
 # Global singleton
-rate_limiter = RateLimiter()
+rate_limiter = _build_rate_limiter()
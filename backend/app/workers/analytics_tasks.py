@@ -1,71 +1,113 @@
 """Celery tasks for periodic analytics fetching."""
 
-from app.workers.celery_app import celery_app
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import Row
+
+from app.workers.celery_app import celery_app, run_async
+
+# Accounts processed concurrently. Each one holds its own DB session, and the
+# page queries only borrow a connection briefly, so this stays below the
+# engine's default pool capacity (5 connections + 10 overflow).
+ACCOUNT_CONCURRENCY = 10
+# Accounts read per keyset page
+ACCOUNT_PAGE_SIZE = 100
+
+
+async def _for_each_active_account(handle: Callable[[Row], Awaitable[None]]) -> None:
+    """Run ``handle`` for every active account, ACCOUNT_CONCURRENCY at a time.
+
+    Accounts are read in keyset pages ordered by id, each on a short-lived
+    session, so no connection sits idle in a transaction while platform APIs
+    are called. A page is only read once the previous one has been handed
+    out, so memory stays bounded however many accounts exist. Handlers run in
+    a TaskGroup: if one raises or a page query fails, the rest are cancelled.
+    """
+    import asyncio
+
+    from sqlalchemy import select
+
+    from app.db.session import async_session
+    from app.models.social_account import SocialAccount
+
+    semaphore = asyncio.Semaphore(ACCOUNT_CONCURRENCY)
+
+    async def run(account: Row) -> None:
+        try:
+            await handle(account)
+        finally:
+            semaphore.release()
+
+    page = (
+        select(SocialAccount.id, SocialAccount.platform, SocialAccount.platform_username)
+        .where(SocialAccount.is_active.is_(True))
+        .order_by(SocialAccount.id)
+        .limit(ACCOUNT_PAGE_SIZE)
+    )
+    async with asyncio.TaskGroup() as tg:
+        stmt = page
+        while True:
+            async with async_session() as db:
+                accounts = (await db.execute(stmt)).all()
+            for account in accounts:
+                await semaphore.acquire()
+                tg.create_task(run(account))
+            if len(accounts) < ACCOUNT_PAGE_SIZE:
+                break
+            stmt = page.where(SocialAccount.id > accounts[-1].id)
 
 
 @celery_app.task(name="app.workers.analytics_tasks.fetch_all_metrics")
 def fetch_all_metrics():
     """Periodic task to fetch metrics for all active accounts."""
-    import asyncio
-
-    asyncio.run(_async_fetch_all())
+    run_async(_async_fetch_all())
 
 
 async def _async_fetch_all():
     import logging
 
-    from sqlalchemy import select
-
     from app.db.session import async_session
-    from app.models.social_account import SocialAccount
     from app.services.analytics_service import fetch_platform_metrics
 
     logger = logging.getLogger(__name__)
 
-    async with async_session() as db:
-        result = await db.execute(
-            select(SocialAccount).where(SocialAccount.is_active.is_(True))
-        )
-        accounts = result.scalars().all()
-
-        for account in accounts:
+    async def fetch_one(account: Row) -> None:
+        async with async_session() as db:
             try:
                 metrics = await fetch_platform_metrics(account.id, db)
-                logger.info("Fetched metrics for %s (%s): %s", account.platform_username, account.platform, metrics)
+                await db.commit()
+                logger.info(
+                    "Fetched metrics for %s (%s): %s",
+                    account.platform_username,
+                    account.platform,
+                    metrics,
+                )
             except Exception as e:
                 logger.error("Failed to fetch metrics for %s: %s", account.id, e)
 
-        await db.commit()
+    # Platform API latency dominates, so fan out across accounts
+    await _for_each_active_account(fetch_one)
 
 
 @celery_app.task(name="app.workers.analytics_tasks.analyze_all_engagement")
 def analyze_all_engagement():
     """Periodic task to analyze engagement patterns for all accounts."""
-    import asyncio
-
-    asyncio.run(_async_analyze_all())
+    run_async(_async_analyze_all())
 
 
 async def _async_analyze_all():
     import logging
 
-    from sqlalchemy import select
-
     from app.db.session import async_session
-    from app.models.social_account import SocialAccount
     from app.services.best_time_service import analyze_engagement_patterns
 
     logger = logging.getLogger(__name__)
 
-    async with async_session() as db:
-        result = await db.execute(
-            select(SocialAccount).where(SocialAccount.is_active.is_(True))
-        )
-        accounts = result.scalars().all()
-
-        for account in accounts:
+    async def analyze_one(account: Row) -> None:
+        async with async_session() as db:
             try:
                 slots = await analyze_engagement_patterns(account.id, db)
+                await db.commit()
                 logger.info(
                     "Analyzed engagement for %s (%s): %d slots",
                     account.platform_username,
@@ -75,4 +117,4 @@ async def _async_analyze_all():
             except Exception as e:
                 logger.error("Failed to analyze engagement for %s: %s", account.id, e)
 
-        await db.commit()
+    await _for_each_active_account(analyze_one)
@@ -1,11 +1,21 @@
+import asyncio
+import threading
+from collections.abc import Coroutine
+from typing import Any, TypeVar
+
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 
 from app.core.config import settings
 
+T = TypeVar("T")
+
 celery_app = Celery(
     "social_media_manager",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
+    # Task modules are listed explicitly so each is imported exactly once
+    include=["app.workers.publish_tasks", "app.workers.analytics_tasks"],
 )
 
 celery_app.conf.update(
@@ -14,10 +24,14 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Redis redelivers any task left unacked this long, and ETA tasks stay
+    # unacked until they run. Keep it above post_service.DISPATCH_HORIZON (1h)
+    # so tasks waiting for their ETA are not redelivered and duplicated.
+    broker_transport_options={"visibility_timeout": 7200},
     beat_schedule={
-        "process-scheduled-posts-every-60s": {
-            "task": "app.workers.publish_tasks.process_pending_scheduled_posts",
-            "schedule": 60.0,  # every 60 seconds
+        "reconcile-scheduled-posts-every-5-minutes": {
+            "task": "app.workers.publish_tasks.reconcile_scheduled_posts",
+            "schedule": 300.0,  # 5 minutes
         },
         "refresh-tokens-every-6-hours": {
             "task": "app.workers.publish_tasks.refresh_expiring_tokens",
@@ -34,4 +48,39 @@ celery_app.conf.update(
     },
 )
 
-celery_app.autodiscover_tasks(["app.workers"])
+
+# ── Per-process event loop ───────────────────────────────────────────────────
+# Each worker process runs one long-lived loop in a background thread, so the
+# async DB engine's connection pool (bound to the loop that opened it) stays
+# warm across tasks instead of being rebuilt by asyncio.run() every time.
+_worker_loop: asyncio.AbstractEventLoop | None = None
+
+
+@worker_process_init.connect
+def _start_worker_loop(**kwargs) -> None:
+    global _worker_loop
+    _worker_loop = asyncio.new_event_loop()
+    threading.Thread(
+        target=_worker_loop.run_forever, name="celery-asyncio", daemon=True
+    ).start()
+
+
+@worker_process_shutdown.connect
+def _stop_worker_loop(**kwargs) -> None:
+    from app.db.session import engine
+
+    if _worker_loop is None:
+        return
+    asyncio.run_coroutine_threadsafe(engine.dispose(), _worker_loop).result(timeout=10)
+    _worker_loop.call_soon_threadsafe(_worker_loop.stop)
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine to completion from a synchronous Celery task.
+
+    Falls back to asyncio.run() outside a prefork worker process (e.g. solo
+    pool or eager mode), where no per-process loop was started.
+    """
+    if _worker_loop is None:
+        return asyncio.run(coro)
+    return asyncio.run_coroutine_threadsafe(coro, _worker_loop).result()
@@ -1,112 +1,149 @@
 import logging
+from datetime import datetime, timedelta, timezone
 
-from app.workers.celery_app import celery_app
+from app.workers.celery_app import celery_app, run_async
 
 logger = logging.getLogger(__name__)
 
 
-@celery_app.task(name="app.workers.publish_tasks.process_pending_scheduled_posts")
-def process_pending_scheduled_posts():
-    """Periodic task: scan for scheduled posts that are due and dispatch them."""
-    import asyncio
-
-    asyncio.run(_async_process_pending())
+@celery_app.task(name="app.workers.publish_tasks.publish_scheduled_post", bind=True)
+def publish_scheduled_post(self, post_id: str):
+    """Publish a scheduled post. Queued with an ETA when the post is scheduled."""
+    run_async(_async_publish(post_id, self.request.id))
 
 
-async def _async_process_pending():
-    from datetime import datetime, timezone
-
-    from sqlalchemy import select
+async def _async_publish(post_id: str, task_id: str | None = None):
+    from sqlalchemy import select, update
+    from sqlalchemy.orm import load_only, selectinload
 
     from app.db.session import async_session
-    from app.models.post import ScheduledPost
+    from app.models.media_asset import MediaAsset
+    from app.models.post import PostMedia, PostPlatform, ScheduledPost
+    from app.models.social_account import SocialAccount
+    from app.services.post_service import _load_post_for_publish, _publish_post
 
     async with async_session() as db:
-        now = datetime.now(timezone.utc)
+        # Claim the schedule in one statement. Cancelled posts, tasks superseded
+        # by a reschedule and duplicate deliveries of an ETA task all miss here.
+        claim = update(ScheduledPost).where(
+            ScheduledPost.post_id == post_id,
+            ScheduledPost.status == "pending",
+        )
+        if task_id is not None:
+            claim = claim.where(ScheduledPost.celery_task_id == task_id)
         result = await db.execute(
-            select(ScheduledPost).where(
-                ScheduledPost.status == "pending",
-                ScheduledPost.scheduled_time <= now,
-            )
+            claim.values(status="processing")
+            .returning(ScheduledPost.id)
+            .execution_options(synchronize_session=False)
         )
-        due_posts = list(result.scalars().all())
-        if not due_posts:
+        sp_id = result.scalar_one_or_none()
+        if sp_id is None:
+            logger.info("Post %s was cancelled or rescheduled, skipping publish", post_id)
+            return
+        await db.commit()
+
+        post = await _load_post_for_publish(post_id, db)
+        if not post or post.status not in ("scheduled",):
+            logger.info("Post %s not found or not in scheduled state, skipping", post_id)
             return
 
-        # Mark as processing to prevent re-dispatch
-        post_ids = []
-        for sp in due_posts:
-            sp.status = "processing"
-            post_ids.append(str(sp.post_id))
+        # Only load the account columns the platform clients read
+        pp_result = await db.execute(
+            select(PostPlatform)
+            .options(
+                selectinload(PostPlatform.social_account).load_only(
+                    SocialAccount.platform,
+                    SocialAccount.access_token,
+                    SocialAccount.platform_user_id,
+                    SocialAccount.meta_page_id,
+                )
+            )
+            .where(PostPlatform.post_id == post_id)
+        )
+        post_platforms = list(pp_result.scalars().all())
+
+        media_result = await db.execute(
+            select(MediaAsset)
+            .options(load_only(MediaAsset.file_path))
+            .join(PostMedia, PostMedia.media_asset_id == MediaAsset.id)
+            .where(PostMedia.post_id == post_id)
+            .order_by(PostMedia.position)
+        )
+        media_assets = list(media_result.scalars().all())
+
+        await _publish_post(post, post_platforms, media_assets, None, db)
+
+        # Update scheduled post status
+        await db.execute(
+            update(ScheduledPost).where(ScheduledPost.id == sp_id).values(status="completed")
+        )
+
         await db.commit()
+        logger.info("Published scheduled post %s", post_id)
 
-    # Dispatch each one to the publish task
-    for post_id in post_ids:
-        logger.info("Dispatching scheduled post %s for publishing", post_id)
-        publish_scheduled_post.delay(post_id)
 
+# A pending post this far past its time has lost its ETA task (failed send,
+# broker restart without persistence) or is stuck behind busy workers.
+OVERDUE_AFTER = timedelta(minutes=5)
 
-@celery_app.task(name="app.workers.publish_tasks.publish_scheduled_post")
-def publish_scheduled_post(post_id: str):
-    """Publish a scheduled post. Called by the poller or directly."""
-    import asyncio
 
-    asyncio.run(_async_publish(post_id))
+@celery_app.task(name="app.workers.publish_tasks.reconcile_scheduled_posts")
+def reconcile_scheduled_posts():
+    """Periodic task that hands pending scheduled posts to Celery when needed.
 
+    Dispatches posts that came within DISPATCH_HORIZON without a task id,
+    including rows left behind by the old 60s poller, and re-dispatches
+    overdue ones under a new task id. The publish task's claim skips any
+    late copy of the old task.
+    """
+    run_async(_async_reconcile_scheduled())
 
-async def _async_publish(post_id: str):
-    from sqlalchemy import select
-    from sqlalchemy.orm import selectinload
+
+async def _async_reconcile_scheduled() -> int:
+    from sqlalchemy import and_, or_, select
 
     from app.db.session import async_session
-    from app.models.post import Post, PostMedia, PostPlatform, ScheduledPost
-    from app.services.post_service import _publish_post
+    from app.models.post import ScheduledPost
+    from app.services.post_service import DISPATCH_HORIZON, enqueue_scheduled_publish
 
+    now = datetime.now(timezone.utc)
     async with async_session() as db:
+        # Both ranges are served by the idx_sp_pending partial index. Rows a
+        # publish task is claiming right now are skipped and seen next run.
         result = await db.execute(
-            select(Post)
-            .options(
-                selectinload(Post.post_platforms).selectinload(PostPlatform.social_account),
-                selectinload(Post.post_media).selectinload(PostMedia.media_asset),
+            select(ScheduledPost)
+            .where(
+                ScheduledPost.status == "pending",
+                or_(
+                    and_(
+                        ScheduledPost.celery_task_id.is_(None),
+                        ScheduledPost.scheduled_time <= now + DISPATCH_HORIZON,
+                    ),
+                    ScheduledPost.scheduled_time < now - OVERDUE_AFTER,
+                ),
             )
-            .where(Post.id == post_id)
+            .with_for_update(skip_locked=True)
         )
-        post = result.scalar_one_or_none()
-        if not post or post.status not in ("scheduled",):
-            logger.info("Post %s not found or not in scheduled state, skipping", post_id)
-            return
-
-        # Check if the scheduled post was cancelled in the meantime
-        sp_result = await db.execute(
-            select(ScheduledPost).where(ScheduledPost.post_id == post_id)
-        )
-        sp = sp_result.scalar_one_or_none()
-        if sp and sp.status == "cancelled":
-            logger.info("Post %s was cancelled, skipping publish", post_id)
-            return
-
-        accounts = [pp.social_account for pp in post.post_platforms]
-        media_assets = [pm.media_asset for pm in post.post_media]
-
-        await _publish_post(post, accounts, media_assets, None, db)
-
-        # Update scheduled post status
-        if sp:
-            sp.status = "completed"
-
+        scheduled_posts = list(result.scalars().all())
+        for sp in scheduled_posts:
+            enqueue_scheduled_publish(sp, db)
+        # Dispatches go out from the session's after-commit hook
         await db.commit()
-        logger.info("Published scheduled post %s", post_id)
+
+    if scheduled_posts:
+        logger.info("Dispatched %d due or overdue scheduled posts", len(scheduled_posts))
+    return len(scheduled_posts)
 
 
 @celery_app.task(name="app.workers.publish_tasks.refresh_expiring_tokens")
 def refresh_expiring_tokens():
     """Periodic task to refresh tokens expiring within 24 hours."""
-    import asyncio
-    asyncio.run(_async_refresh_tokens())
+    run_async(_async_refresh_tokens())
 
 
 async def _async_refresh_tokens():
-    from datetime import datetime, timedelta, timezone
+    import asyncio
+    from collections import defaultdict
 
     from sqlalchemy import select
 
@@ -115,6 +152,27 @@ async def _async_refresh_tokens():
     from app.models.social_account import SocialAccount
     from app.services.post_service import get_platform_client
 
+    # Refreshes run concurrently, but at most 4 at a time against one provider
+    provider_limits: defaultdict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(4))
+
+    async def refresh_one(account: SocialAccount) -> None:
+        # Only the OAuth call is awaited; the session is touched synchronously
+        try:
+            client = get_platform_client(account)
+            refresh_token = decrypt_token(account.refresh_token)
+            async with provider_limits[account.platform]:
+                new_tokens = await client.refresh_access_token(refresh_token)
+
+            account.access_token = encrypt_token(new_tokens.access_token)
+            if new_tokens.refresh_token:
+                account.refresh_token = encrypt_token(new_tokens.refresh_token)
+            if new_tokens.expires_in:
+                account.token_expires_at = datetime.now(timezone.utc) + timedelta(
+                    seconds=new_tokens.expires_in
+                )
+        except Exception:
+            account.is_active = False
+
     async with async_session() as db:
         threshold = datetime.now(timezone.utc) + timedelta(hours=24)
         result = await db.execute(
@@ -125,21 +183,8 @@ async def _async_refresh_tokens():
                 SocialAccount.refresh_token.isnot(None),
             )
         )
+        accounts = list(result.scalars().all())
 
-        for account in result.scalars().all():
-            try:
-                client = get_platform_client(account)
-                refresh_token = decrypt_token(account.refresh_token)
-                new_tokens = await client.refresh_access_token(refresh_token)
-
-                account.access_token = encrypt_token(new_tokens.access_token)
-                if new_tokens.refresh_token:
-                    account.refresh_token = encrypt_token(new_tokens.refresh_token)
-                if new_tokens.expires_in:
-                    account.token_expires_at = datetime.now(timezone.utc) + timedelta(
-                        seconds=new_tokens.expires_in
-                    )
-            except Exception:
-                account.is_active = False
+        await asyncio.gather(*(refresh_one(account) for account in accounts))
 
         await db.commit()
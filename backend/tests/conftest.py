@@ -1,86 +1,183 @@
 """Shared test fixtures for the backend test suite.
 
-Uses a real PostgreSQL test database (social_media_manager_test) to verify
-actual SQL, constraints, and migrations.
+Uses a real PostgreSQL test database to verify actual SQL, constraints, and
+migrations. Under pytest-xdist (``pytest -n auto``) each worker gets its own
+database (social_media_manager_test_gw0, _gw1, ...), created on first use.
 
-Strategy: each test gets a fresh AsyncClient. The app's get_db dependency
-is overridden to create a fresh session per request (mirroring production),
-backed by the test database engine. Tables are truncated after each test
-for clean isolation.
+Strategy: one engine and one AsyncClient are shared by the whole session,
+all running on a single session-scoped event loop (asyncpg connections are
+bound to the loop that opened them). All test traffic goes through a single
+connection inside an outer transaction. Each test opens a SAVEPOINT on it and
+rolls it back at teardown, so nothing a test writes is ever committed. The
+app's get_db dependency is overridden to create a fresh session per request
+(mirroring production) that joins the test's transaction.
 """
 
+import asyncio
 import os
-import uuid
+from functools import partial
 
-import pytest_asyncio
+import pytest
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import text
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from pytest_asyncio import is_async_test
+from sqlalchemy import make_url, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 # ── Override settings BEFORE any app import ─────────────────────────────────
-os.environ["DATABASE_URL"] = (
-    "postgresql+asyncpg://jarvis@localhost:5432/social_media_manager_test"
-)
+TEST_DATABASE_NAME = f"social_media_manager_test_{os.environ.get('PYTEST_XDIST_WORKER', 'gw0')}"
+os.environ["DATABASE_URL"] = f"postgresql+asyncpg://jarvis@localhost:5432/{TEST_DATABASE_NAME}"
 os.environ["APP_ENV"] = "test"
 os.environ["ANTHROPIC_API_KEY"] = "test-key-not-real"
 os.environ["SECRET_KEY"] = "test-secret-key-for-testing-only"
 os.environ["JWT_SECRET_KEY"] = "test-jwt-secret-key-for-testing"
 os.environ["FERNET_KEY"] = "uD31ThfwWWgq6nzAtIQeAV2sNSPJAEPsTJLUDkMEshI="
 
+from app.core import security  # noqa: E402
+from app.core.security import create_access_token, encrypt_token, hash_password  # noqa: E402
 from app.db.base import Base  # noqa: E402
-from app.db.session import get_db  # noqa: E402
+from app.db.session import HookedAsyncSession, get_db  # noqa: E402
 from app.main import app  # noqa: E402
+from app.models.social_account import SocialAccount  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import post_service  # noqa: E402
 
 # ── Test DB URL ──────────────────────────────────────────────────────────────
 TEST_DATABASE_URL = os.environ["DATABASE_URL"]
 
+# Empties every app table in one statement (cascade handles FK constraints)
+_TRUNCATE_ALL = text(
+    "TRUNCATE "
+    + ", ".join(t.name for t in reversed(Base.metadata.sorted_tables))
+    + " RESTART IDENTITY CASCADE"
+)
+
+# ── Seeded user ──────────────────────────────────────────────────────────────
+SEED_USER_EMAIL = "qa_tester@example.com"
+SEED_USER_PASSWORD = "testpass123"
+
+
+# ── One event loop for the whole session ─────────────────────────────────────
+@pytest.fixture(scope="session")
+def event_loop_policy():
+    """Run the suite on uvloop where it is available (it has no Windows build)."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.DefaultEventLoopPolicy()
+    return uvloop.EventLoopPolicy()
+
+
+def pytest_collection_modifyitems(items):
+    """Run every async test on the session-scoped event loop."""
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(session_loop, append=False)
+
 
-# ── Create / drop tables once per session ────────────────────────────────────
-@pytest_asyncio.fixture(scope="session", autouse=True)
-async def setup_database():
-    """Create all tables at session start, drop at session end."""
-    engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+# ── Cheap bcrypt ─────────────────────────────────────────────────────────────
+@pytest.fixture(scope="session", autouse=True)
+def _fast_bcrypt():
+    """Hash with the minimum bcrypt cost (4) instead of the default (12).
+
+    Hashes stay real bcrypt, so verification and the hashing tests behave
+    exactly as in production; only the work factor drops.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(security.bcrypt, "gensalt", partial(security.bcrypt.gensalt, rounds=4))
+        yield
+
+
+# ── Create tables once per session ───────────────────────────────────────────
+async def _create_database_if_missing() -> None:
+    """Create this worker's test database through the ``postgres`` maintenance DB."""
+    bootstrap = create_async_engine(
+        make_url(TEST_DATABASE_URL).set(database="postgres"), isolation_level="AUTOCOMMIT"
+    )
+    async with bootstrap.connect() as conn:
+        exists = await conn.scalar(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"),
+            {"name": TEST_DATABASE_NAME},
+        )
+        if not exists:
+            await conn.execute(text(f'CREATE DATABASE "{TEST_DATABASE_NAME}"'))
+    await bootstrap.dispose()
+
+
+@pytest.fixture(scope="session")
+async def engine():
+    """One engine (and connection pool) for the whole session."""
+    await _create_database_if_missing()
+    # Tests share one long-lived connection; the second covers session setup.
+    # asyncpg's statement cache stays on since that connection reuses it.
+    engine = create_async_engine(
+        TEST_DATABASE_URL, echo=False, pool_size=2, max_overflow=0, pool_reset_on_return=None
+    )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def setup_database(engine):
+    """Create any missing tables at session start.
+
+    Tables are kept between runs since create_all is idempotent and tests never
+    commit data. Set TEST_DROP_ON_EXIT=1 to drop them at session end, e.g. in
+    CI or after changing a model's columns (create_all won't alter a table).
+    """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    await engine.dispose()
     yield
-    engine = create_async_engine(TEST_DATABASE_URL, echo=False)
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-    await engine.dispose()
+    if os.environ.get("TEST_DROP_ON_EXIT") == "1":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
 
 
-# ── Per-test truncate for isolation ──────────────────────────────────────────
-@pytest_asyncio.fixture(autouse=True)
-async def clean_tables():
-    """Truncate all tables after each test for full isolation."""
-    yield
-    engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+# ── Shared connection and client ─────────────────────────────────────────────
+@pytest.fixture(scope="session")
+async def connection(engine, setup_database):
+    """The connection every test runs on, inside a never-committed transaction."""
+    # Safety net: start from empty tables even if an earlier run left data behind
     async with engine.begin() as conn:
-        # Truncate all app tables (cascade handles FK constraints)
-        table_names = [t.name for t in reversed(Base.metadata.sorted_tables)]
-        if table_names:
-            await conn.execute(
-                text(f"TRUNCATE {', '.join(table_names)} CASCADE")
-            )
-    await engine.dispose()
+        await conn.execute(_TRUNCATE_ALL)
 
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        yield conn
+        await trans.rollback()
 
-# ── Per-test client ──────────────────────────────────────────────────────────
-@pytest_asyncio.fixture
-async def client():
-    """Provide an httpx AsyncClient wired to the FastAPI app with test DB.
 
-    Each call to get_db creates a fresh session from the test engine,
-    mirroring production behaviour. No shared session = no concurrent-op issues.
-    """
-    test_engine = create_async_engine(TEST_DATABASE_URL, echo=False)
-    test_session_factory = async_sessionmaker(
-        test_engine, class_=AsyncSession, expire_on_commit=False
+@pytest.fixture(scope="session")
+async def session_factory(connection):
+    # Sessions join the test's transaction; commit() only releases a savepoint
+    return async_sessionmaker(
+        bind=connection,
+        class_=HookedAsyncSession,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
     )
 
+
+@pytest.fixture(scope="session")
+async def _session_client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+async def client(connection, session_factory, _session_client):
+    """Provide the shared httpx AsyncClient wired to the FastAPI app with test DB.
+
+    Each call to get_db creates a fresh session, mirroring production
+    behaviour. Everything the test writes is rolled back with its SAVEPOINT.
+    """
+    nested = await connection.begin_nested()
+    # Requests share one connection, and asyncpg allows one operation at a time
+    request_lock = asyncio.Lock()
+
     async def _override_get_db():
-        async with test_session_factory() as session:
+        async with request_lock, session_factory() as session:
             try:
                 yield session
                 await session.commit()
@@ -89,39 +186,113 @@ async def client():
                 raise
 
     app.dependency_overrides[get_db] = _override_get_db
-
-    transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as ac:
-        yield ac
+    yield _session_client
 
     app.dependency_overrides.clear()
-    await test_engine.dispose()
-
-
-# ── Helper: register + login, return headers ─────────────────────────────────
-@pytest_asyncio.fixture
-async def auth_headers(client: AsyncClient) -> dict[str, str]:
-    """Register a test user and return Authorization headers."""
-    unique = uuid.uuid4().hex[:8]
-    email = f"test_{unique}@example.com"
-
-    # Register
-    reg_resp = await client.post(
-        "/api/v1/auth/register",
-        json={
-            "email": email,
-            "password": "testpass123",
-            "full_name": "QA Tester",
-        },
-    )
-    assert reg_resp.status_code == 201, f"Registration failed: {reg_resp.text}"
+    _session_client.cookies.clear()
+    await nested.rollback()
+
+
+@pytest.fixture(autouse=True)
+def celery_dispatches(monkeypatch) -> dict[str, list]:
+    """Record scheduled-publish dispatches and revokes instead of sending them."""
+    sent: dict[str, list] = {"published": [], "revoked": []}
+
+    def record(publishes, revokes):
+        sent["published"].extend(publishes)
+        sent["revoked"].extend(revokes)
+
+    monkeypatch.setattr(post_service, "_send_schedule_changes", record)
+    return sent
+
+
+# ── Raw ASGI calls ───────────────────────────────────────────────────────────
+@pytest.fixture
+def raw_asgi(client):
+    """Call the app with a bare ASGI scope, skipping httpx entirely.
+
+    For cheap requests that only need the status and body. Returns an async
+    ``call(method, path, headers=None) -> (status, body)``. Depends on
+    ``client`` for the test's get_db override and SAVEPOINT.
+    """
+
+    async def call(
+        method: str, path: str, headers: dict[str, str] | None = None
+    ) -> tuple[int, bytes]:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"test")]
+            + [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+            "client": ("127.0.0.1", 123),
+            "server": ("test", 80),
+        }
+        status = 0
+        body = bytearray()
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if request_sent:
+                return {"type": "http.disconnect"}
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                body.extend(message.get("body", b""))
+
+        await app(scope, receive, send)
+        return status, bytes(body)
+
+    return call
+
+
+# ── Seeded user + auth headers ───────────────────────────────────────────────
+@pytest.fixture(scope="session")
+async def seeded_user(session_factory, _fast_bcrypt) -> User:
+    """A user inserted once on the outer transaction, so it outlives every test.
+
+    Changes a test makes to it are rolled back with the test's SAVEPOINT.
+    """
+    async with session_factory() as session:
+        user = User(
+            email=SEED_USER_EMAIL,
+            hashed_password=hash_password(SEED_USER_PASSWORD),
+            full_name="QA Tester",
+        )
+        session.add(user)
+        await session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_headers(seeded_user: User) -> dict[str, str]:
+    """Authorization headers for the seeded user, minted without an HTTP login."""
+    return {"Authorization": f"Bearer {create_access_token(seeded_user.id)}"}
 
-    # Login
-    login_resp = await client.post(
-        "/api/v1/auth/login",
-        json={"email": email, "password": "testpass123"},
-    )
-    assert login_resp.status_code == 200, f"Login failed: {login_resp.text}"
 
-    tokens = login_resp.json()
-    return {"Authorization": f"Bearer {tokens['access_token']}"}
+@pytest.fixture
+async def social_account(client, session_factory, seeded_user: User) -> SocialAccount:
+    """A connected account for the seeded user, rolled back with the test."""
+    async with session_factory() as session:
+        account = SocialAccount(
+            user_id=seeded_user.id,
+            platform="twitter",
+            platform_user_id="qa-twitter-id",
+            platform_username="qa_tester",
+            access_token=encrypt_token("test-access-token"),
+        )
+        session.add(account)
+        await session.commit()
+    return account
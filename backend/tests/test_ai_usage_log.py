@@ -0,0 +1,79 @@
+"""Tests for the batched background writer behind AI usage logging."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.analytics import AIUsageLog
+from app.services import strategy_copilot_service as copilot
+
+
+def _entry(user_id: str) -> dict:
+    return {
+        "user_id": user_id,
+        "action_type": "strategy",
+        "input_tokens": 10,
+        "output_tokens": 20,
+        "model": "test-model",
+    }
+
+
+@pytest.fixture
+async def ai_log_session(client, session_factory, monkeypatch):
+    """Point the usage-log writer at the test connection and stop it afterwards."""
+    monkeypatch.setattr(copilot, "async_session", session_factory)
+    yield session_factory
+    await copilot.flush_ai_usage_log()
+
+
+async def _logged_rows(session_factory, user_id: str) -> int:
+    async with session_factory() as session:
+        return await session.scalar(
+            select(func.count()).select_from(AIUsageLog).where(AIUsageLog.user_id == user_id)
+        )
+
+
+class TestNextBatch:
+    async def test_batch_closes_at_batch_size(self):
+        queue: asyncio.Queue[dict] = asyncio.Queue()
+        for i in range(copilot._AI_LOG_BATCH_SIZE * 2 + 5):
+            queue.put_nowait({"n": i})
+
+        sizes = [len(await copilot._next_ai_log_batch(queue)) for _ in range(3)]
+        assert sizes == [copilot._AI_LOG_BATCH_SIZE, copilot._AI_LOG_BATCH_SIZE, 5]
+
+    async def test_batch_closes_at_deadline(self):
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[dict] = asyncio.Queue()
+        queue.put_nowait({"n": 0})
+        loop.call_later(copilot._AI_LOG_FLUSH_INTERVAL / 2, queue.put_nowait, {"n": 1})
+        loop.call_later(copilot._AI_LOG_FLUSH_INTERVAL * 3, queue.put_nowait, {"n": 2})
+
+        started = loop.time()
+        batch = await copilot._next_ai_log_batch(queue)
+
+        # The entry arriving inside the interval joins; the late one waits
+        assert batch == [{"n": 0}, {"n": 1}]
+        assert loop.time() - started < copilot._AI_LOG_FLUSH_INTERVAL * 3
+
+
+class TestWriter:
+    async def test_flush_writes_queued_rows(self, ai_log_session, seeded_user):
+        for _ in range(3):
+            copilot._log_ai_usage(seeded_user.id, "strategy", 10, 20, "test-model")
+
+        await copilot.flush_ai_usage_log()
+
+        assert await _logged_rows(ai_log_session, seeded_user.id) == 3
+
+    async def test_bad_row_does_not_drop_batch(self, ai_log_session, seeded_user):
+        batch = [
+            _entry(seeded_user.id),
+            _entry("00000000-0000-0000-0000-000000000000"),  # violates the user FK
+            _entry(seeded_user.id),
+        ]
+
+        await copilot._write_ai_log_batch(batch)
+
+        assert await _logged_rows(ai_log_session, seeded_user.id) == 2
@@ -43,10 +43,6 @@ class TestAnalyticsDashboard:
         )
         assert resp.status_code == 200
 
-    async def test_dashboard_no_auth(self, client: AsyncClient):
-        resp = await client.get("/api/v1/analytics/dashboard")
-        assert resp.status_code == 401
-
     async def test_dashboard_has_post_counts(self, client: AsyncClient, auth_headers: dict):
         """Dashboard overview total_posts should match actual post count."""
         resp = await client.get(
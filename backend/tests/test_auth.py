@@ -111,10 +111,6 @@ class TestGetMe:
         assert data["full_name"] == "QA Tester"
         assert data["is_active"] is True
 
-    async def test_get_me_no_token(self, client: AsyncClient):
-        resp = await client.get("/api/v1/auth/me")
-        assert resp.status_code == 401
-
     async def test_get_me_invalid_token(self, client: AsyncClient):
         resp = await client.get(
             "/api/v1/auth/me",
@@ -0,0 +1,22 @@
+"""Every protected endpoint must reject requests without a token."""
+
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.parametrize(
+    "method,path,json",
+    [
+        ("GET", "/api/v1/auth/me", None),
+        ("GET", "/api/v1/accounts/", None),
+        ("GET", "/api/v1/accounts/twitter/connect", None),
+        ("GET", "/api/v1/analytics/dashboard", None),
+        ("GET", "/api/v1/media/", None),
+        ("GET", "/api/v1/posts/", None),
+        ("DELETE", "/api/v1/posts/some-id", None),
+        ("PUT", "/api/v1/settings/profile", {"full_name": "Hacker"}),
+    ],
+)
+async def test_requires_auth(client: AsyncClient, method: str, path: str, json: dict | None):
+    resp = await client.request(method, path, json=json)
+    assert resp.status_code == 401
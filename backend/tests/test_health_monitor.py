@@ -0,0 +1,119 @@
+"""Tests for the account health monitor."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.utils.health_monitor import HealthMonitor, HealthStatus
+
+
+@pytest.fixture
+def monitor() -> HealthMonitor:
+    return HealthMonitor()
+
+
+def _in(hours: float) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(hours=hours)
+
+
+class TestStatusTransitions:
+    def test_new_account_is_healthy(self, monitor: HealthMonitor):
+        assert monitor.get_health("twitter", "a")["status"] == HealthStatus.HEALTHY
+
+    def test_consecutive_errors_escalate(self, monitor: HealthMonitor):
+        monitor.record_error("twitter", "a", "boom")
+        assert monitor.get_health("twitter", "a")["status"] == HealthStatus.HEALTHY
+
+        monitor.record_error("twitter", "a", "boom")
+        assert monitor.get_health("twitter", "a")["status"] == HealthStatus.WARNING
+
+        for _ in range(3):
+            monitor.record_error("twitter", "a", "boom")
+        health = monitor.get_health("twitter", "a")
+        assert health["status"] == HealthStatus.ERROR
+        assert health["consecutive_errors"] == 5
+        assert health["last_error"] == "boom"
+
+    def test_success_resets_errors(self, monitor: HealthMonitor):
+        for _ in range(5):
+            monitor.record_error("twitter", "a", "boom")
+        monitor.record_publish("twitter", "a")
+
+        health = monitor.get_health("twitter", "a")
+        assert health["status"] == HealthStatus.HEALTHY
+        assert health["consecutive_errors"] == 0
+        assert health["total_api_calls"] == 6
+        assert health["total_errors"] == 5
+        assert health["total_publishes"] == 1
+
+    def test_auth_failure_disconnects(self, monitor: HealthMonitor):
+        monitor.record_auth_failure("instagram", "a")
+        assert monitor.get_health("instagram", "a")["status"] == HealthStatus.DISCONNECTED
+
+    def test_token_expiry_sets_status(self, monitor: HealthMonitor):
+        monitor.set_token_expiry("twitter", "soon", _in(2))
+        monitor.set_token_expiry("twitter", "expired", _in(-1))
+        monitor.set_token_expiry("twitter", "later", _in(72))
+
+        assert monitor.get_health("twitter", "soon")["status"] == HealthStatus.WARNING
+        assert monitor.get_health("twitter", "expired")["status"] == HealthStatus.DISCONNECTED
+        assert monitor.get_health("twitter", "later")["status"] == HealthStatus.HEALTHY
+
+    def test_token_expiring_later_is_downgraded_when_read(self, monitor: HealthMonitor):
+        expires_at = _in(72)
+        monitor.set_token_expiry("twitter", "a", expires_at)
+
+        now = (expires_at - timedelta(hours=1)).timestamp()
+        assert monitor.get_health("twitter", "a", now=now)["status"] == HealthStatus.WARNING
+
+
+class TestAccountsNeedingAttention:
+    def test_flags_unhealthy_and_expiring_accounts(self, monitor: HealthMonitor):
+        monitor.record_success("twitter", "healthy")
+        monitor.set_token_expiry("twitter", "long-lived", _in(72))
+        monitor.record_auth_failure("facebook", "disconnected")
+        monitor.set_token_expiry("instagram", "expiring", _in(30))
+
+        # Ten hours on, the 30h token has under a day left but no one has
+        # read its health yet, so its stored status is still healthy
+        now = _in(10).timestamp()
+        flagged = {
+            row["account_id"]: row["status"]
+            for row in monitor.get_accounts_needing_attention(now=now)
+        }
+        assert flagged == {
+            "disconnected": HealthStatus.DISCONNECTED,
+            "expiring": HealthStatus.WARNING,
+        }
+
+    def test_expired_token_is_disconnected(self, monitor: HealthMonitor):
+        monitor.set_token_expiry("tiktok", "a", _in(30))
+        assert monitor.get_accounts_needing_attention() == []
+
+        [row] = monitor.get_accounts_needing_attention(now=_in(31).timestamp())
+        assert row["account_id"] == "a"
+        assert row["status"] == HealthStatus.DISCONNECTED
+
+
+class TestRemoveAccount:
+    def test_remove_middle_account_keeps_others_intact(self, monitor: HealthMonitor):
+        monitor.record_publish("twitter", "first")
+        monitor.record_error("facebook", "middle", "boom")
+        for _ in range(2):
+            monitor.record_error("instagram", "last", "rate limited")
+
+        monitor.remove_account("facebook", "middle")
+
+        assert {row["account_id"] for row in monitor.get_all_health()} == {"first", "last"}
+        last = monitor.get_health("instagram", "last")
+        assert last["status"] == HealthStatus.WARNING
+        assert last["consecutive_errors"] == 2
+        assert last["last_error"] == "rate limited"
+        assert monitor.get_health("twitter", "first")["total_publishes"] == 1
+
+    def test_remove_unknown_account_is_a_no_op(self, monitor: HealthMonitor):
+        monitor.record_success("twitter", "a")
+
+        monitor.remove_account("twitter", "missing")
+
+        assert [row["account_id"] for row in monitor.get_all_health()] == ["a"]
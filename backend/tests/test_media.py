@@ -1,43 +1,47 @@
 """Tests for media upload endpoints."""
 
 import io
+import json
 
 import pytest
 from httpx import AsyncClient
 
+# Minimal 1x1 red pixel PNG
+PNG_1X1 = (
+    b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01"
+    b"\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00"
+    b"\x00\x00\x0cIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00"
+    b"\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82"
+)
+
+
+@pytest.fixture
+def png_file():
+    """Build a fresh upload tuple per call; the BytesIO is consumed on send."""
+    return lambda: ("test.png", io.BytesIO(PNG_1X1), "image/png")
+
 
 class TestMediaList:
     """GET /api/v1/media/"""
 
-    async def test_list_media_empty(self, client: AsyncClient, auth_headers: dict):
-        resp = await client.get("/api/v1/media/", headers=auth_headers)
-        assert resp.status_code == 200
-        data = resp.json()
+    async def test_list_media_empty(self, raw_asgi, auth_headers: dict):
+        status, body = await raw_asgi("GET", "/api/v1/media/", auth_headers)
+        assert status == 200
+        data = json.loads(body)
         assert "items" in data
         assert "total" in data
         assert data["total"] == 0
 
-    async def test_list_media_no_auth(self, client: AsyncClient):
-        resp = await client.get("/api/v1/media/")
-        assert resp.status_code == 401
-
 
 class TestMediaUpload:
     """POST /api/v1/media/upload"""
 
-    async def test_upload_image(self, client: AsyncClient, auth_headers: dict):
+    async def test_upload_image(self, client: AsyncClient, auth_headers: dict, png_file):
         """Upload a minimal PNG file."""
-        # Minimal 1x1 red pixel PNG
-        png_bytes = (
-            b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01"
-            b"\x00\x00\x00\x01\x08\x02\x00\x00\x00\x90wS\xde\x00"
-            b"\x00\x00\x0cIDATx\x9cc\xf8\x0f\x00\x00\x01\x01\x00"
-            b"\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82"
-        )
         resp = await client.post(
             "/api/v1/media/upload",
             headers=auth_headers,
-            files={"file": ("test.png", io.BytesIO(png_bytes), "image/png")},
+            files={"file": png_file()},
         )
         assert resp.status_code == 201
         data = resp.json()
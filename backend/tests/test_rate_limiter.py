@@ -0,0 +1,156 @@
+"""Tests for the rate limiting primitives and the Redis-backed daily counter."""
+
+import asyncio
+
+import pytest
+
+from app.utils import rate_limiter as rate_limiter_module
+from app.utils.rate_limiter import (
+    PLATFORM_RATE_LIMITS,
+    RateLimiter,
+    RedisRateLimiter,
+    SlidingWindowCounter,
+)
+
+TIKTOK_DAILY_LIMIT = PLATFORM_RATE_LIMITS["tiktok"].max_publishes_per_day
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable replacement for time.time() inside the rate limiter."""
+
+    class Clock:
+        now = 1_000_000.0  # aligned to a 100s window boundary
+
+    monkeypatch.setattr(rate_limiter_module.time, "time", lambda: Clock.now)
+    return Clock
+
+
+class TestSlidingWindowCounter:
+    def test_allows_up_to_max_requests(self, clock):
+        window = SlidingWindowCounter(max_requests=3, window_seconds=100)
+        for _ in range(3):
+            assert window.can_proceed()
+            window.record()
+        assert not window.can_proceed()
+        assert window.remaining == 0
+
+    def test_previous_window_is_weighted_by_overlap(self, clock):
+        window = SlidingWindowCounter(max_requests=10, window_seconds=100)
+        for _ in range(10):
+            window.record()
+
+        # Halfway into the next window, half of the previous window still counts
+        clock.now += 150
+        assert window.current_count == 5
+        assert window.remaining == 5
+        assert window.can_proceed()
+
+    def test_old_windows_are_forgotten(self, clock):
+        window = SlidingWindowCounter(max_requests=2, window_seconds=100)
+        window.record()
+        window.record()
+
+        clock.now += 250
+        assert window.current_count == 0
+        assert window.can_proceed()
+
+    def test_time_until_available(self, clock):
+        window = SlidingWindowCounter(max_requests=4, window_seconds=100)
+        assert window.time_until_available() == 0.0
+        for _ in range(4):
+            window.record()
+
+        # Full current window: a slot opens once it rolls over
+        assert window.time_until_available() == pytest.approx(100.0)
+
+        # Two calls into the next window, the previous window must decay to below 2
+        clock.now += 100
+        window.record()
+        window.record()
+        wait = window.time_until_available()
+        assert wait == pytest.approx(50.0)
+        assert not window.can_proceed()
+
+        clock.now += wait + 0.01
+        assert window.can_proceed()
+
+
+@pytest.fixture
+async def redis_limiter(monkeypatch):
+    """A RedisRateLimiter backed by fakeredis, which runs the Lua scripts via lupa."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    monkeypatch.setattr(rate_limiter_module, "Redis", fakeredis.FakeAsyncRedis)
+    limiter = RedisRateLimiter("redis://localhost:6379/0")
+    yield limiter
+    redis = await limiter._client()
+    await redis.flushall()
+    await redis.aclose()
+
+
+class TestDailyPublishReservation:
+    async def test_in_memory_reserve_and_release(self):
+        limiter = RateLimiter()
+        for _ in range(TIKTOK_DAILY_LIMIT):
+            assert await limiter.reserve_publish("tiktok", "acct")
+        assert not await limiter.reserve_publish("tiktok", "acct")
+
+        await limiter.release_publish("tiktok", "acct")
+        assert await limiter.reserve_publish("tiktok", "acct")
+
+    async def test_redis_stops_at_daily_limit(self, redis_limiter):
+        for _ in range(TIKTOK_DAILY_LIMIT):
+            assert await redis_limiter.reserve_publish("tiktok", "acct")
+        assert not await redis_limiter.reserve_publish("tiktok", "acct")
+
+        # A refused reservation is taken back, and the day's key expires by midnight
+        redis = await redis_limiter._client()
+        assert int(await redis.get("rl:daily:tiktok:acct")) == TIKTOK_DAILY_LIMIT
+        assert 0 < await redis.ttl("rl:daily:tiktok:acct") <= 86400
+
+    async def test_redis_concurrent_reservations_never_overshoot(self, redis_limiter):
+        results = await asyncio.gather(
+            *[
+                redis_limiter.reserve_publish("tiktok", "acct")
+                for _ in range(TIKTOK_DAILY_LIMIT * 3)
+            ]
+        )
+        assert results.count(True) == TIKTOK_DAILY_LIMIT
+
+    async def test_redis_release_returns_a_slot(self, redis_limiter):
+        for _ in range(TIKTOK_DAILY_LIMIT):
+            await redis_limiter.reserve_publish("tiktok", "acct")
+
+        await redis_limiter.release_publish("tiktok", "acct")
+        assert await redis_limiter.reserve_publish("tiktok", "acct")
+
+    async def test_redis_release_without_reservation_is_a_no_op(self, redis_limiter):
+        await redis_limiter.release_publish("tiktok", "acct")
+
+        redis = await redis_limiter._client()
+        assert await redis.get("rl:daily:tiktok:acct") is None
+
+
+class TestRedisStatus:
+    async def test_status_reads_redis_counters(self, redis_limiter, monkeypatch):
+        # Entries are scored by the Redis clock, whatever the host's says
+        monkeypatch.setattr(rate_limiter_module.time, "time", lambda: 0.0)
+        for _ in range(3):
+            await redis_limiter.acquire("tiktok", "acct")
+        await redis_limiter.reserve_publish("tiktok", "acct")
+
+        status = await redis_limiter.get_status("tiktok", "acct")
+        assert status["api_calls_used"] == 3
+        assert status["api_calls_remaining"] == PLATFORM_RATE_LIMITS["tiktok"].max_requests - 3
+        assert status["publishes_remaining_today"] == TIKTOK_DAILY_LIMIT - 1
+
+    async def test_all_statuses_lists_accounts_from_redis(self, redis_limiter):
+        await redis_limiter.acquire("twitter", "a")
+        await redis_limiter.reserve_publish("tiktok", "b")
+
+        statuses = await redis_limiter.get_all_statuses()
+        assert {(s["platform"], s["account_id"]) for s in statuses} == {
+            ("twitter", "a"),
+            ("tiktok", "b"),
+        }
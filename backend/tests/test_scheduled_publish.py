@@ -0,0 +1,201 @@
+"""Tests for handing scheduled posts to Celery and claiming them in the worker."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select, update
+
+from app.db import session as db_session
+from app.models.post import ScheduledPost
+from app.services import post_service
+from app.workers.publish_tasks import _async_publish, _async_reconcile_scheduled
+
+
+@pytest.fixture
+def published(monkeypatch, session_factory) -> list[str]:
+    """Run worker code on the test connection and record posts it would publish."""
+    calls: list[str] = []
+
+    async def fake_publish(post, post_platforms, media_assets, platform_captions, db):
+        calls.append(post.id)
+
+    monkeypatch.setattr(db_session, "async_session", session_factory)
+    monkeypatch.setattr(post_service, "_publish_post", fake_publish)
+    return calls
+
+
+async def _schedule_post(
+    client: AsyncClient, auth_headers: dict, account_id: str, due_in=timedelta(minutes=10)
+) -> str:
+    resp = await client.post(
+        "/api/v1/posts/",
+        headers=auth_headers,
+        json={
+            "caption": "Scheduled from QA suite",
+            "account_ids": [account_id],
+            "schedule_time": (datetime.now(timezone.utc) + due_in).isoformat(),
+        },
+    )
+    assert resp.status_code == 201
+    return resp.json()["id"]
+
+
+async def _scheduled_row(session_factory, post_id: str) -> ScheduledPost:
+    async with session_factory() as session:
+        return await session.scalar(select(ScheduledPost).where(ScheduledPost.post_id == post_id))
+
+
+class TestDispatchAfterCommit:
+    """Dispatches are sent by the session's after-commit hook, never before."""
+
+    async def test_rollback_drops_dispatches(
+        self, client, auth_headers, social_account, session_factory, celery_dispatches
+    ):
+        post_id = await _schedule_post(client, auth_headers, social_account.id)
+        assert len(celery_dispatches["published"]) == 1
+
+        async with session_factory() as session:
+            sp = await session.scalar(select(ScheduledPost).where(ScheduledPost.post_id == post_id))
+            post_service.enqueue_scheduled_publish(sp, session)
+            await session.rollback()
+
+        assert len(celery_dispatches["published"]) == 1
+
+
+class TestPublishClaim:
+    """_async_publish only runs for the task id currently on the schedule."""
+
+    async def test_current_task_publishes(
+        self, client, auth_headers, social_account, session_factory, published
+    ):
+        post_id = await _schedule_post(client, auth_headers, social_account.id)
+        sp = await _scheduled_row(session_factory, post_id)
+
+        await _async_publish(post_id, sp.celery_task_id)
+
+        assert published == [post_id]
+        assert (await _scheduled_row(session_factory, post_id)).status == "completed"
+
+    async def test_stale_task_id_is_skipped(
+        self, client, auth_headers, social_account, session_factory, published
+    ):
+        post_id = await _schedule_post(client, auth_headers, social_account.id)
+
+        await _async_publish(post_id, f"sp:{post_id}:superseded")
+
+        assert published == []
+        assert (await _scheduled_row(session_factory, post_id)).status == "pending"
+
+    async def test_cancelled_post_is_skipped(
+        self, client, auth_headers, social_account, session_factory, published
+    ):
+        post_id = await _schedule_post(client, auth_headers, social_account.id)
+        task_id = (await _scheduled_row(session_factory, post_id)).celery_task_id
+
+        resp = await client.post(f"/api/v1/posts/{post_id}/cancel", headers=auth_headers)
+        assert resp.status_code == 200
+        await _async_publish(post_id, task_id)
+
+        assert published == []
+        assert (await _scheduled_row(session_factory, post_id)).status == "cancelled"
+
+    async def test_cancel_then_reschedule_uses_new_task_id(
+        self, client, auth_headers, social_account, session_factory, published, celery_dispatches
+    ):
+        post_id = await _schedule_post(client, auth_headers, social_account.id)
+        old_task_id = (await _scheduled_row(session_factory, post_id)).celery_task_id
+
+        await client.post(f"/api/v1/posts/{post_id}/cancel", headers=auth_headers)
+        new_time = datetime.now(timezone.utc) + timedelta(minutes=30)
+        resp = await client.put(
+            f"/api/v1/posts/{post_id}",
+            headers=auth_headers,
+            json={"schedule_time": new_time.isoformat()},
+        )
+        assert resp.status_code == 200
+
+        sp = await _scheduled_row(session_factory, post_id)
+        assert sp.status == "pending"
+        assert sp.celery_task_id not in (None, old_task_id)
+        assert celery_dispatches["revoked"] == [old_task_id]
+        assert [task_id for _, _, task_id in celery_dispatches["published"]] == [
+            old_task_id,
+            sp.celery_task_id,
+        ]
+
+        # The revoked task may still be delivered; it must not publish
+        await _async_publish(post_id, old_task_id)
+        assert published == []
+        await _async_publish(post_id, sp.celery_task_id)
+        assert published == [post_id]
+
+
+class TestDispatchHorizon:
+    """Posts beyond DISPATCH_HORIZON wait for the reconcile task."""
+
+    async def test_far_off_post_is_not_dispatched(
+        self, client, auth_headers, social_account, session_factory, celery_dispatches
+    ):
+        due_in = post_service.DISPATCH_HORIZON + timedelta(hours=1)
+        post_id = await _schedule_post(client, auth_headers, social_account.id, due_in)
+
+        assert celery_dispatches["published"] == []
+        assert (await _scheduled_row(session_factory, post_id)).celery_task_id is None
+
+
+class TestReconcile:
+    """reconcile_scheduled_posts dispatches due rows and recovers lost tasks."""
+
+    async def test_dispatches_due_rows_without_task_id(
+        self, client, auth_headers, social_account, session_factory, published, celery_dispatches
+    ):
+        post_id = await _schedule_post(client, auth_headers, social_account.id)
+        async with session_factory() as session:
+            await session.execute(
+                update(ScheduledPost)
+                .where(ScheduledPost.post_id == post_id)
+                .values(celery_task_id=None)
+            )
+            await session.commit()
+        celery_dispatches["published"].clear()
+
+        assert await _async_reconcile_scheduled() == 1
+
+        sp = await _scheduled_row(session_factory, post_id)
+        assert celery_dispatches["published"] == [(post_id, sp.scheduled_time, sp.celery_task_id)]
+        # Dispatched rows that are not overdue are left alone on the next run
+        assert await _async_reconcile_scheduled() == 0
+
+    async def test_redispatches_overdue_rows(
+        self, client, auth_headers, social_account, session_factory, published, celery_dispatches
+    ):
+        post_id = await _schedule_post(client, auth_headers, social_account.id)
+        lost_task_id = (await _scheduled_row(session_factory, post_id)).celery_task_id
+        async with session_factory() as session:
+            await session.execute(
+                update(ScheduledPost)
+                .where(ScheduledPost.post_id == post_id)
+                .values(scheduled_time=datetime.now(timezone.utc) - timedelta(minutes=10))
+            )
+            await session.commit()
+
+        assert await _async_reconcile_scheduled() == 1
+
+        sp = await _scheduled_row(session_factory, post_id)
+        assert sp.celery_task_id not in (None, lost_task_id)
+        assert celery_dispatches["revoked"] == [lost_task_id]
+
+        await _async_publish(post_id, lost_task_id)
+        assert published == []
+        await _async_publish(post_id, sp.celery_task_id)
+        assert published == [post_id]
+
+    async def test_leaves_far_off_rows_for_later(
+        self, client, auth_headers, social_account, session_factory, published, celery_dispatches
+    ):
+        due_in = post_service.DISPATCH_HORIZON + timedelta(hours=1)
+        await _schedule_post(client, auth_headers, social_account.id, due_in)
+
+        assert await _async_reconcile_scheduled() == 0
+        assert celery_dispatches["published"] == []
@@ -12,6 +12,16 @@ from app.core.security import (
     verify_password,
 )
 
+# Tokens are only read by these tests, so one of each is enough
+ACCESS_TOKEN = create_access_token("user-456")
+REFRESH_TOKEN = create_refresh_token("user-789")
+
+
+@pytest.fixture(scope="module")
+def secretpass_hash() -> str:
+    """Hashed once per module, after conftest has lowered the bcrypt cost."""
+    return hash_password("secretpass")
+
 
 class TestPasswordHashing:
     def test_hash_password_returns_string(self):
@@ -19,13 +29,11 @@ class TestPasswordHashing:
         assert isinstance(hashed, str)
         assert hashed != "mypassword"
 
-    def test_verify_correct_password(self):
-        hashed = hash_password("secretpass")
-        assert verify_password("secretpass", hashed) is True
+    def test_verify_correct_password(self, secretpass_hash):
+        assert verify_password("secretpass", secretpass_hash) is True
 
-    def test_verify_wrong_password(self):
-        hashed = hash_password("secretpass")
-        assert verify_password("wrongpass", hashed) is False
+    def test_verify_wrong_password(self, secretpass_hash):
+        assert verify_password("wrongpass", secretpass_hash) is False
 
     def test_different_hashes_for_same_password(self):
         h1 = hash_password("same")
@@ -40,20 +48,17 @@ class TestPasswordHashing:
 
 class TestJWT:
     def test_create_access_token(self):
-        token = create_access_token("user-123")
-        assert isinstance(token, str)
-        assert len(token) > 50
+        assert isinstance(ACCESS_TOKEN, str)
+        assert len(ACCESS_TOKEN) > 50
 
     def test_decode_access_token(self):
-        token = create_access_token("user-456")
-        payload = decode_token(token)
+        payload = decode_token(ACCESS_TOKEN)
         assert payload is not None
         assert payload["sub"] == "user-456"
         assert payload["type"] == "access"
 
     def test_create_refresh_token(self):
-        token = create_refresh_token("user-789")
-        payload = decode_token(token)
+        payload = decode_token(REFRESH_TOKEN)
         assert payload is not None
         assert payload["sub"] == "user-789"
         assert payload["type"] == "refresh"